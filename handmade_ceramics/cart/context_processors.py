@@ -1,7 +1,11 @@
-from .models import Cart
+from .models import CartItem
 
 def cart_count(request):
+    shopper = getattr(request, 'shopper', None)
+    if shopper is not None:
+        return {'cart_count': shopper.cart_count}
+
     if request.user.is_authenticated:
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        return {'cart_count': cart.items.count()}  # distinct items, not total quantity
+        # count lines without creating a Cart row on every page view
+        return {'cart_count': CartItem.objects.filter(cart__user=request.user).count()}  # distinct items, not total quantity
     return {'cart_count': 0}
\ No newline at end of file
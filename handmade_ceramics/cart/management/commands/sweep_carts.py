@@ -0,0 +1,106 @@
+# cart/management/commands/sweep_carts.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from cart.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete empty carts, cart lines for deleted/unlisted variants and "
+        "expired sessions in small id-ranged batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'CART_SWEEP_BATCH_SIZE', 500),
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=getattr(settings, 'CART_SWEEP_SLEEP_SECONDS', 0.5),
+            help="Seconds to pause between batches.",
+        )
+        parser.add_argument(
+            '--grace-days',
+            type=int,
+            default=getattr(settings, 'CART_SWEEP_GRACE_DAYS', 7),
+            help="Only sweep carts/lines untouched for this many days.",
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.pause = options['sleep']
+        self.dry_run = options['dry_run']
+
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['grace_days'])
+
+        # The grace period applies to unlisted variants too, so one that
+        # is relisted within it keeps its cart lines.
+        stale_lines = CartItem.objects.filter(
+            Q(variant__is_deleted=True) |
+            Q(variant__is_listed=False) |
+            Q(variant__product__is_deleted=True),
+            variant__updated_at__lt=cutoff,
+        )
+
+        empty_carts = Cart.objects.filter(
+            ~Exists(CartItem.objects.filter(cart=OuterRef('pk'))),
+            created_at__lt=cutoff,
+        )
+
+        expired_sessions = Session.objects.filter(expire_date__lt=now)
+
+        # Lines first, so carts emptied by this run are swept as well.
+        for label, queryset in (
+            ("stale cart lines", stale_lines),
+            ("empty carts", empty_carts),
+            ("expired sessions", expired_sessions),
+        ):
+            count = self.sweep(queryset)
+            verb = "Would delete" if self.dry_run else "Deleted"
+            self.stdout.write(f"{verb} {count} {label}.")
+
+    def sweep(self, queryset):
+        """
+        Walk the matching rows in primary-key order and delete them one
+        pk range at a time, re-checking the filter inside each range.
+        """
+        total = 0
+        last_pk = None
+
+        while True:
+            window = queryset.order_by('pk')
+            if last_pk is not None:
+                window = window.filter(pk__gt=last_pk)
+
+            pks = list(window.values_list('pk', flat=True)[:self.batch_size])
+            if not pks:
+                break
+
+            batch = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+            if self.dry_run:
+                total += len(pks)
+            else:
+                deleted, _ = batch.delete()
+                total += deleted
+
+            last_pk = pks[-1]
+
+            if len(pks) < self.batch_size:
+                break
+
+            time.sleep(self.pause)
+
+        return total
@@ -0,0 +1,161 @@
+# cart/services.py
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, When, Value, Q, F, CharField
+from django.db.models.functions import Least
+
+from product_management.models import apply_discount, get_best_discount_percentages
+from .models import CartItem
+
+
+AVAILABLE = 'AVAILABLE'
+DELETED = 'DELETED'
+UNLISTED = 'UNLISTED'
+OUT_OF_STOCK = 'OUT_OF_STOCK'
+OVER_LIMIT = 'OVER_LIMIT'
+CATEGORY_BLOCKED = 'CATEGORY_BLOCKED'
+
+
+def max_qty_limit():
+    return getattr(settings, 'CART_MAX_QTY_PER_ITEM', 10)
+
+
+def annotate_availability(queryset):
+    """
+    Annotate every cart line with its availability status and the
+    maximum quantity that can currently be bought, computed in SQL.
+    """
+    allowed_max = Least(F('variant__stock'), Value(max_qty_limit()))
+
+    return queryset.select_related(
+        'variant__product__category'
+    ).annotate(
+        allowed_max=allowed_max,
+        availability=Case(
+            When(
+                Q(variant__is_deleted=True) |
+                Q(variant__product__is_deleted=True),
+                then=Value(DELETED)
+            ),
+            When(
+                Q(variant__product__category__is_deleted=True) |
+                Q(variant__product__category__is_listed=False),
+                then=Value(CATEGORY_BLOCKED)
+            ),
+            When(variant__stock__lte=0, then=Value(OUT_OF_STOCK)),
+            When(
+                Q(variant__is_listed=False) |
+                Q(variant__product__is_listed=False),
+                then=Value(UNLISTED)
+            ),
+            When(quantity__gt=allowed_max, then=Value(OVER_LIMIT)),
+            default=Value(AVAILABLE),
+            output_field=CharField(),
+        ),
+    )
+
+
+class CartValidation:
+    """
+    Result of validating a user's cart in a single query.
+
+    `items` is a list (never re-queried) where each line carries
+    `availability`, `allowed_max` and `is_available`.
+    """
+
+    def __init__(self, items, clamped_items=None):
+        self.items = items
+        self.clamped_items = clamped_items or []
+
+    @property
+    def is_empty(self):
+        return not self.items
+
+    @property
+    def problems(self):
+        return [item for item in self.items if not item.is_available]
+
+    @property
+    def first_problem(self):
+        problems = self.problems
+        return problems[0] if problems else None
+
+    @property
+    def is_valid(self):
+        return not self.is_empty and not self.problems
+
+
+def validate_cart(user, clamp=False, lock=False):
+    """
+    Validate every line of the user's cart with one SELECT.
+
+    With `clamp=True`, over-limit lines are reduced to their allowed
+    maximum and written back with one bulk_update. With `lock=True`,
+    the cart lines (and only they) are selected FOR UPDATE.
+    """
+    queryset = annotate_availability(
+        CartItem.objects.filter(cart__user=user)
+    ).order_by('added_at', 'pk')
+
+    if lock:
+        # only the cart lines: the joined variant, product, category and
+        # cart rows stay unlocked, so checkouts of the same SKU or
+        # category do not queue here; stock is taken by the conditional
+        # decrement later
+        queryset = queryset.select_for_update(of=('self',))
+
+    items = list(queryset)
+    clamped_items = []
+
+    for item in items:
+        if clamp and item.availability == OVER_LIMIT:
+            item.quantity = item.allowed_max
+            item.availability = AVAILABLE
+            clamped_items.append(item)
+
+        item.is_available = item.availability == AVAILABLE
+
+    if clamped_items:
+        CartItem.objects.bulk_update(clamped_items, ['quantity'])
+
+    return CartValidation(items, clamped_items)
+
+
+def availability_message(item):
+    variant = item.variant
+    product = variant.product
+
+    if item.availability == OUT_OF_STOCK:
+        return f"{product.name} ({variant.color}) is out of stock."
+
+    if item.availability == OVER_LIMIT:
+        return (
+            f"Only {item.allowed_max} items available for "
+            f"{product.name} ({variant.color})."
+        )
+
+    if item.availability == UNLISTED:
+        return f"{product.name} ({variant.color}) is currently unavailable."
+
+    return f"{product.name} is currently unavailable."
+
+
+def price_cart_items(items):
+    """
+    Attach `unit_price` and `item_total` to each cart line using one
+    batched offer lookup, and return the subtotal.
+    """
+    products = {item.variant.product_id: item.variant.product for item in items}
+    discounts = get_best_discount_percentages(products.values())
+
+    subtotal = Decimal('0')
+
+    for item in items:
+        product = item.variant.product
+        item.unit_price = apply_discount(product.price, discounts.get(product.pk, 0))
+        item.item_total = item.unit_price * item.quantity
+        subtotal += item.item_total
+
+    return subtotal
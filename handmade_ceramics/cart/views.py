@@ -10,12 +10,13 @@ from django.http import HttpResponseBadRequest, JsonResponse
 from django.urls import reverse
 
 from .models import Cart, CartItem
+from .services import validate_cart, max_qty_limit
 from product_management.models import Variant
 
 try:
-    from wishlist.models import Wishlist
+    from wishlist.services import remove_variants as remove_from_wishlist
 except ImportError:
-    Wishlist = None
+    remove_from_wishlist = None
 
 try:
     from coupons.models import Coupon
@@ -23,10 +24,6 @@ except Exception:
     Coupon = None
 
 
-def _max_qty_limit():
-    return getattr(settings, 'CART_MAX_QTY_PER_ITEM', 10)
-
-
 def _get_user_cart(user):
     cart, _ = Cart.objects.get_or_create(user=user)
     return cart
@@ -69,7 +66,7 @@ def add_to_cart(request):
         messages.error(request, "This category is blocked.")
         return redirect(referer)
 
-    site_max = _max_qty_limit()
+    site_max = max_qty_limit()
     allowed_max = min(site_max, variant.stock or 0)
 
     if allowed_max <= 0:
@@ -101,11 +98,8 @@ def add_to_cart(request):
             messages.success(request, f"Updated {product.name} quantity in your cart.")
 
     cart_item.save()
-    if Wishlist:
-        Wishlist.objects.filter(
-            user=request.user,
-            variant=variant
-        ).delete()
+    if remove_from_wishlist:
+        remove_from_wishlist(request.user, [variant.pk])
 
     return redirect(reverse('cart:cart_page'))
 
@@ -114,34 +108,12 @@ def add_to_cart(request):
 @login_required
 def cart_page(request):
     cart = _get_user_cart(request.user)
-    items = list(cart.items.select_related('variant__product'))
-    
-    has_unavailable_items = False
-    modified_items = False
-    
-    for item in items:
-        variant = item.variant
-        product = variant.product
-        category = getattr(product, 'category', None)
-        
-        item.is_available = True
-        
-        if (variant.is_deleted or not variant.is_listed or 
-            product.is_deleted or not product.is_listed or
-            (category and getattr(category, 'is_blocked', False))):
-            item.is_available = False
-            has_unavailable_items = True
-        else:
-            site_max = _max_qty_limit()
-            allowed_max = min(site_max, variant.stock or 0)
-            item.allowed_max = allowed_max
-            if item.quantity > allowed_max:
-                item.quantity = allowed_max
-                item.save()
-                modified_items = True
-            
-
-    if modified_items:
+    validation = validate_cart(request.user, clamp=True)
+    items = validation.items
+
+    has_unavailable_items = bool(validation.problems)
+
+    if validation.clamped_items:
         messages.info(request, "Quantities for some items were updated due to limited stock.")
 
     subtotal = Decimal('0')
@@ -216,7 +188,7 @@ def update_quantity(request, item_id):
     action = request.POST.get('action')
     qty_val = request.POST.get('qty')
 
-    site_max = _max_qty_limit()
+    site_max = max_qty_limit()
     allowed_max = min(site_max, variant.stock or 0)
 
     if action == 'increment':
@@ -0,0 +1,67 @@
+# checkout/services.py
+
+from decimal import Decimal
+
+from orders.models import OrderItem
+
+
+def build_order_items(order, cart_items, subtotal, discount):
+    """
+    Unsaved OrderItem rows for a priced cart (see cart.services.price_cart_items),
+    with the coupon discount spread across lines in proportion to their
+    subtotal. The last line absorbs any rounding difference.
+    """
+    order_items = []
+    total_discount_distributed = Decimal("0.00")
+
+    for index, item in enumerate(cart_items):
+
+        item_subtotal = item.item_total
+
+        if discount > 0 and subtotal > 0:
+
+            proportion = item_subtotal / subtotal
+
+            item_discount = (
+                discount * proportion
+            ).quantize(Decimal("0.01"))
+
+        else:
+            item_discount = Decimal("0.00")
+
+        if index == len(cart_items) - 1:
+            item_discount = (
+                discount - total_discount_distributed
+            )
+
+        if item_discount < 0:
+            item_discount = Decimal("0.00")
+
+        total_discount_distributed += item_discount
+
+        final_total = item_subtotal - item_discount
+
+        if final_total < 0:
+            final_total = Decimal("0.00")
+
+        variant = item.variant
+
+        # bulk_create skips OrderItem.save(), so item_total is set here
+        order_items.append(OrderItem(
+            order=order,
+
+            product=variant.product,
+            variant=variant,
+
+            product_name=variant.product.name,
+            variant_color=variant.color or "",
+
+            unit_price=item.unit_price,
+            quantity=item.quantity,
+            item_total=item_subtotal,
+
+            coupon_discount_amount=item_discount,
+            final_total=final_total
+        ))
+
+    return order_items
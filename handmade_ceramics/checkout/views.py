@@ -1,11 +1,18 @@
 # checkout/views.py
 
+import uuid
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.contrib import messages
 
 from cart.models import CartItem
+from cart.services import validate_cart, availability_message, price_cart_items
+from product_management.services import decrement_stock, InsufficientStock
+from .services import build_order_items
+from orders.services.reservation_service import ReservationService
+from orders.services.idempotency_service import IdempotencyService, RequestInProgress
 from profiles.models import Address
 from orders.models import Order, OrderItem
 from coupons.models import Coupon, CouponUsage
@@ -13,8 +20,7 @@ from decimal import Decimal
 from coupons.models import Coupon, CouponUsage
 from django.db import transaction
 
-from wallet.services import debit_wallet
-from wallet.models import Wallet
+from wallet.services import InsufficientBalance, debit_wallet
 from django.conf import settings
 
 @login_required
@@ -22,35 +28,14 @@ def checkout_page(request):
 
     user = request.user
 
-    cart_items = (
-        CartItem.objects
-        .filter(
-            cart__user=user,
-
-            variant__isnull=False,
-            variant__is_deleted=False,
-            variant__is_listed=True,
-
-            variant__product__isnull=False,
-            variant__product__is_deleted=False,
-            variant__product__is_listed=True,
-        )
-        .select_related(
-            "variant",
-            "variant__product",
-            "variant__product__category"
-        )
-    )
+    validation = validate_cart(user)
+    cart_items = validation.items
 
-    if not cart_items.exists():
+    if validation.is_empty:
         messages.warning(request, "Your cart is empty.")
         return redirect("cart:cart_page")
 
-    total_cart_count = CartItem.objects.filter(
-        cart__user=user
-    ).count()
-
-    if cart_items.count() != total_cart_count:
+    if validation.problems:
         messages.warning(
             request,
             "Some products in your cart are unavailable. "
@@ -58,52 +43,7 @@ def checkout_page(request):
         )
         return redirect("cart:cart_page")
 
-    for item in cart_items:
-
-        variant = item.variant
-        product = variant.product
-        category = getattr(product, "category", None)
-
-        if product.is_deleted or not product.is_listed:
-            messages.warning(
-                request,
-                f"{product.name} is currently unavailable."
-            )
-            return redirect("cart:cart_page")
-
-        if variant.is_deleted or not variant.is_listed:
-            messages.warning(
-                request,
-                f"{product.name} ({variant.color}) is unavailable."
-            )
-            return redirect("cart:cart_page")
-
-        if category and getattr(category, "is_blocked", False):
-            messages.warning(
-                request,
-                f"{product.name} is currently unavailable."
-            )
-            return redirect("cart:cart_page")
-
-        if variant.stock <= 0:
-            messages.warning(
-                request,
-                f"{product.name} ({variant.color}) is out of stock."
-            )
-            return redirect("cart:cart_page")
-
-        if item.quantity > variant.stock:
-            messages.warning(
-                request,
-                f"Only {variant.stock} items available for "
-                f"{product.name} ({variant.color})."
-            )
-            return redirect("cart:cart_page")
-
-    subtotal = sum(
-        item.variant.product.get_discounted_price() * item.quantity
-        for item in cart_items
-    )
+    subtotal = price_cart_items(cart_items)
 
     tax_amount = Decimal("0.00")
 
@@ -151,6 +91,8 @@ def checkout_page(request):
         "coupon": coupon,
 
         "cod_limit": settings.COD_LIMIT,
+
+        "idempotency_key": uuid.uuid4().hex,
     }
 
     return render(
@@ -160,12 +102,76 @@ def checkout_page(request):
     )
 
 
+def _take_stock(request, cart_items, take=decrement_stock):
+    """
+    Decrement stock for every cart line in one conditional UPDATE
+    (or hold it, when `take` reserves for an online payment).
+    On a shortfall the whole order transaction is rolled back.
+    """
+    try:
+        take(
+            (item.variant_id, item.quantity) for item in cart_items
+        )
+    except InsufficientStock as exc:
+        transaction.set_rollback(True)
+
+        names = {item.variant_id: item.variant for item in cart_items}
+        for variant_id, requested, available in exc.shortfalls:
+            variant = names[variant_id]
+            messages.error(
+                request,
+                f"Only {available} items available for "
+                f"{variant.product.name} ({variant.color})."
+            )
+        return False
+
+    return True
+
+
 @login_required
-@transaction.atomic
 def place_order(request):
     if request.method != "POST":
         return redirect("checkout:checkout")
 
+    key = request.POST.get("idempotency_key")
+    if not key:
+        return _place_order(request)
+
+    # the checkout page issues uuid4 keys; anything else never reaches
+    # the key table
+    try:
+        key = uuid.UUID(key).hex
+    except ValueError:
+        messages.error(request, "Your checkout session is invalid. Please try again.")
+        return redirect("checkout:checkout")
+
+    # a double-click or browser retry replays the first attempt's redirect
+    try:
+        result = IdempotencyService.run_once(
+            "place_order",
+            f"{request.user.pk}:{key}",
+            lambda: {"redirect": _place_order(request).url}
+        )
+    except RequestInProgress:
+        messages.info(request, "Your order is already being placed.")
+        return redirect("orders:order_list")
+
+    return redirect(result["redirect"])
+
+
+def _clear_applied_coupon(request, coupon):
+    """
+    Forget the session's coupon once the order holds it. Only called after
+    stock (and payment) succeeded: the session is not rolled back with the
+    order, so clearing it earlier would lose the coupon on a failed try.
+    """
+    if coupon:
+        request.session.pop("coupon_id", None)
+        request.session.pop("discount_amount", None)
+
+
+@transaction.atomic
+def _place_order(request):
     user = request.user
     address_id = request.POST.get("address_id")
     payment_method = request.POST.get("payment_method", "COD")
@@ -176,80 +182,20 @@ def place_order(request):
 
     address = get_object_or_404(Address, id=address_id, user=user)
 
-    cart_items = (
-        CartItem.objects
-        .filter(
-            cart__user=user,
-
-            variant__isnull=False,
-            variant__is_deleted=False,
-            variant__is_listed=True,
-
-            variant__product__isnull=False,
-            variant__product__is_deleted=False,
-            variant__product__is_listed=True
-        )
-        .select_related("variant__product")
-        .select_for_update()
-    )
+    validation = validate_cart(user, lock=True)
+    cart_items = validation.items
 
-    if not cart_items.exists():
+    if validation.is_empty:
         messages.error(request, "Your cart is empty.")
         return redirect("checkout:checkout")
 
-    total_cart_items = CartItem.objects.filter(cart__user=user).count()
-
-    if cart_items.count() != total_cart_items:
-        messages.error(
-            request,
-            "Some products in your cart are unavailable. Please review your cart."
-        )
-        return redirect("cart:view_cart")
-
-    for item in cart_items:
-        variant = item.variant
-        product = variant.product
-
-        if not product.is_listed:
-            messages.error(
-                request,
-                f"{product.name} is currently unavailable."
-            )
-            return redirect("checkout:checkout")
-
-        if not variant.is_listed:
-            messages.error(
-                request,
-                f"{product.name} ({variant.color}) is currently unavailable."
-            )
-            return redirect("checkout:checkout")
-
-        if product.is_deleted or variant.is_deleted:
-            messages.error(
-                request,
-                f"{product.name} is unavailable."
-            )
-            return redirect("checkout:checkout")
-
-        if variant.stock <= 0:
-            messages.error(
-                request,
-                f"{product.name} ({variant.color}) is out of stock."
-            )
-            return redirect("checkout:checkout")
+    problem = validation.first_problem
 
-        if item.quantity > variant.stock:
-            messages.error(
-                request,
-                f"Only {variant.stock} items available for "
-                f"{product.name} ({variant.color})."
-            )
-            return redirect("checkout:checkout")
+    if problem:
+        messages.error(request, availability_message(problem))
+        return redirect("cart:cart_page")
 
-    subtotal = sum(
-        item.variant.product.get_discounted_price() * item.quantity
-        for item in cart_items
-    )
+    subtotal = price_cart_items(cart_items)
 
     tax_amount = Decimal("0.00")
 
@@ -307,70 +253,9 @@ def place_order(request):
         coupon=coupon if coupon else None,
     )
 
-    if coupon:
-        request.session.pop("coupon_id", None)
-        request.session.pop("discount_amount", None)
-
-    item_data = []
-
-    for item in cart_items:
-        unit_price = item.variant.product.get_discounted_price()
-
-        item_subtotal = unit_price * item.quantity
-
-        item_data.append({
-            "cart_item": item,
-            "unit_price": unit_price,
-            "item_subtotal": item_subtotal,
-        })
-
-    total_discount_distributed = Decimal("0.00")
-
-    for index, data in enumerate(item_data):
-
-        item_subtotal = data["item_subtotal"]
-
-        if discount > 0 and subtotal > 0:
-
-            proportion = item_subtotal / subtotal
-
-            item_discount = (
-                discount * proportion
-            ).quantize(Decimal("0.01"))
-
-        else:
-            item_discount = Decimal("0.00")
-
-        if index == len(item_data) - 1:
-            item_discount = (
-                discount - total_discount_distributed
-            )
-
-        if item_discount < 0:
-            item_discount = Decimal("0.00")
-
-        total_discount_distributed += item_discount
-
-        final_total = item_subtotal - item_discount
-
-        if final_total < 0:
-            final_total = Decimal("0.00")
-
-        OrderItem.objects.create(
-            order=order,
-
-            product=data["cart_item"].variant.product,
-            variant=data["cart_item"].variant,
-
-            product_name=data["cart_item"].variant.product.name,
-            variant_color=data["cart_item"].variant.color or "",
-
-            unit_price=data["unit_price"],
-            quantity=data["cart_item"].quantity,
-
-            coupon_discount_amount=item_discount,
-            final_total=final_total
-        )
+    OrderItem.objects.bulk_create(
+        build_order_items(order, cart_items, subtotal, discount)
+    )
 
     if payment_method == "COD":
 
@@ -381,11 +266,10 @@ def place_order(request):
                 order=order
             )
 
-        for item in cart_items:
-            variant = item.variant
+        if not _take_stock(request, cart_items):
+            return redirect("cart:cart_page")
 
-            variant.stock -= item.quantity
-            variant.save()
+        _clear_applied_coupon(request, coupon)
 
         CartItem.objects.filter(
             cart__user=user
@@ -398,11 +282,21 @@ def place_order(request):
 
     elif payment_method == "WALLET":
 
-        wallet = Wallet.objects.select_for_update().get(
-            user=user
-        )
+        if not _take_stock(request, cart_items):
+            return redirect("cart:cart_page")
 
-        if wallet.balance < order.total_amount:
+        # debited last and without a prior lock: the wallet row is only
+        # held from here to the commit
+        try:
+            debit_wallet(
+                request.shopper.wallet,
+                order.total_amount,
+                f"Payment for order {order.order_id}",
+                order=order,
+                source="ORDER_PAYMENT"
+            )
+        except InsufficientBalance:
+            transaction.set_rollback(True)
 
             messages.error(
                 request,
@@ -411,17 +305,12 @@ def place_order(request):
 
             return redirect("checkout:checkout")
 
-        debit_wallet(
-            wallet,
-            order.total_amount,
-            f"Payment for order {order.order_id}",
-            order=order
-        )
-
         order.is_paid = True
         order.status = "CONFIRMED"
         order.save()
 
+        _clear_applied_coupon(request, coupon)
+
         if coupon:
             CouponUsage.objects.create(
                 user=user,
@@ -429,12 +318,6 @@ def place_order(request):
                 order=order
             )
 
-        for item in cart_items:
-            variant = item.variant
-
-            variant.stock -= item.quantity
-            variant.save()
-
         CartItem.objects.filter(
             cart__user=user
         ).delete()
@@ -445,6 +328,17 @@ def place_order(request):
         )
     
     else:
+        # hold the stock until the gateway confirms, or the hold expires
+        reserved = _take_stock(
+            request,
+            cart_items,
+            take=lambda lines: ReservationService.reserve(order, lines)
+        )
+        if not reserved:
+            return redirect("cart:cart_page")
+
+        _clear_applied_coupon(request, coupon)
+
         return redirect(
             "payments:start",
             order_id=order.order_id
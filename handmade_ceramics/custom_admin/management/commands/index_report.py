@@ -0,0 +1,111 @@
+# custom_admin/management/commands/index_report.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+STATS_SINCE_SQL = """
+    SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()
+"""
+
+# non-unique indexes never used since the last stats reset; unique and
+# primary key indexes are kept because they enforce constraints
+UNUSED_SQL = """
+    SELECT s.relname, s.indexrelname, s.idx_scan,
+           pg_size_pretty(pg_relation_size(s.indexrelid))
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.idx_scan <= %(max_scans)s
+      AND NOT i.indisunique
+      AND NOT i.indisprimary
+    ORDER BY pg_relation_size(s.indexrelid) DESC
+    LIMIT %(limit)s
+"""
+
+# tables read mostly by sequential scans while holding enough rows for an
+# index to matter: candidates for a missing index
+MISSING_SQL = """
+    SELECT relname, seq_scan, seq_tup_read, COALESCE(idx_scan, 0), n_live_tup
+    FROM pg_stat_user_tables
+    WHERE n_live_tup >= %(min_rows)s
+      AND seq_scan > COALESCE(idx_scan, 0)
+    ORDER BY seq_tup_read DESC
+    LIMIT %(limit)s
+"""
+
+# how often each index was used, for before/after comparisons
+USAGE_SQL = """
+    SELECT relname, indexrelname, idx_scan, idx_tup_read,
+           pg_size_pretty(pg_relation_size(indexrelid))
+    FROM pg_stat_user_indexes
+    ORDER BY idx_scan DESC
+    LIMIT %(limit)s
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Report unused indexes and tables that look like they are missing "
+        "one, from PostgreSQL's pg_stat_user_indexes/pg_stat_user_tables. "
+        "Numbers are cumulative since the last statistics reset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help="Ignore tables smaller than this for missing-index hints.")
+        parser.add_argument('--max-scans', type=int, default=0,
+                            help="Treat indexes scanned at most this often as unused.")
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument('--usage', action='store_true',
+                            help="Also list the most used indexes.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("index_report needs PostgreSQL statistics views.")
+
+        params = {
+            'min_rows': options['min_rows'],
+            'max_scans': options['max_scans'],
+            'limit': options['limit'],
+        }
+
+        with connection.cursor() as cursor:
+            cursor.execute(STATS_SINCE_SQL)
+            row = cursor.fetchone()
+            since = row[0] if row and row[0] else "database start"
+            self.stdout.write(f"Statistics since {since}\n")
+
+            self.section(
+                cursor, "Unused indexes", UNUSED_SQL, params,
+                ('table', 'index', 'scans', 'size'),
+            )
+            self.section(
+                cursor, "Tables scanned sequentially", MISSING_SQL, params,
+                ('table', 'seq scans', 'rows read', 'index scans', 'rows'),
+            )
+            if options['usage']:
+                self.section(
+                    cursor, "Most used indexes", USAGE_SQL, params,
+                    ('table', 'index', 'scans', 'rows read', 'size'),
+                )
+
+    def section(self, cursor, title, sql, params, headers):
+        cursor.execute(sql, params)
+        rows = [tuple(str(value) for value in row) for row in cursor.fetchall()]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+
+        if not rows:
+            self.stdout.write("  (none)\n")
+            return
+
+        widths = [
+            max(len(headers[n]), *(len(row[n]) for row in rows))
+            for n in range(len(headers))
+        ]
+        line = "  " + "  ".join(f"{{:<{w}}}" for w in widths)
+
+        self.stdout.write(line.format(*headers))
+        for row in rows:
+            self.stdout.write(line.format(*row))
+        self.stdout.write("")
@@ -74,6 +74,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'my_site.no_cache_middleware.NoCacheMiddleware',
     'my_site.blocked_user_middleware.BlockedUserMiddleware',
+    'my_site.shopper_middleware.ShopperMiddleware',
 ]
 
 ROOT_URLCONF = 'handmade_ceramics.urls'
@@ -219,6 +220,67 @@ STORAGES = {
 
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET')
+RAZORPAY_WEBHOOK_SECRET = config('RAZORPAY_WEBHOOK_SECRET', default='')
 
 COD_LIMIT = 1000
-DELIVERY_CHARGE = 50
\ No newline at end of file
+DELIVERY_CHARGE = 50
+
+# cart sweeper (python manage.py sweep_carts)
+CART_SWEEP_GRACE_DAYS = 7
+CART_SWEEP_BATCH_SIZE = 500
+CART_SWEEP_SLEEP_SECONDS = 0.5
+
+# back-in-stock emails for wishlisted variants
+RESTOCK_ALERTS_ASYNC = True
+RESTOCK_EMAIL_BATCH_SIZE = 100
+RESTOCK_EMAIL_BATCH_PAUSE = 1.0
+RESTOCK_ALERT_CLAIM_SECONDS = 900
+
+# stock held for unpaid online orders (python manage.py expire_reservations)
+STOCK_RESERVATION_TTL_MINUTES = 15
+
+# hot variants sell from sharded stock (python manage.py stock_shards)
+STOCK_SHARDS_PER_VARIANT = 8
+
+# idempotency keys for order placement
+IDEMPOTENCY_STALE_SECONDS = 120
+IDEMPOTENCY_KEY_TTL_DAYS = 7
+
+# invoice PDFs, cached per order version and pre-rendered in a process pool
+INVOICE_CACHE_DIR = os.path.join(BASE_DIR, 'invoice_cache')
+INVOICE_RENDER_ASYNC = True
+INVOICE_WORKERS = 2
+DISPATCH_EXPORT_MAX_ORDERS = 500
+
+# order event outbox (python manage.py relay_order_events)
+ORDER_EVENTS_RELAY_ASYNC = True
+ORDER_EVENTS_BATCH_SIZE = 200
+ORDER_EVENTS_MAX_ATTEMPTS = 5
+ORDER_STATUS_EMAILS = True
+
+# Razorpay HTTP client: pooled, with timeouts and bounded retries
+RAZORPAY_CONNECT_TIMEOUT = 3.05
+RAZORPAY_READ_TIMEOUT = 10
+RAZORPAY_MAX_RETRIES = 2
+RAZORPAY_RETRY_BACKOFF = 0.3
+RAZORPAY_POOL_SIZE = 10
+RAZORPAY_SLOW_CALL_MS = 2000
+
+# gateway client factory; 'payments.fake_gateway.FakeRazorpayClient' runs
+# checkout offline for load tests, with the simulated behaviour below
+PAYMENT_GATEWAY_CLIENT = config(
+    'PAYMENT_GATEWAY_CLIENT', default='payments.services.build_razorpay_client'
+)
+RAZORPAY_FAKE_LATENCY_MS = config('RAZORPAY_FAKE_LATENCY_MS', default=0, cast=int)
+RAZORPAY_FAKE_LATENCY_JITTER_MS = config('RAZORPAY_FAKE_LATENCY_JITTER_MS', default=0, cast=int)
+RAZORPAY_FAKE_ERROR_RATE = config('RAZORPAY_FAKE_ERROR_RATE', default=0.0, cast=float)
+RAZORPAY_FAKE_DECLINE_RATE = config('RAZORPAY_FAKE_DECLINE_RATE', default=0.0, cast=float)
+
+# stale online payments and abandoned orders (python manage.py reconcile_payments)
+PAYMENT_RECONCILE_AFTER_MINUTES = 30
+PAYMENT_RECONCILE_CHUNK_SIZE = 200
+ABANDONED_ORDER_ARCHIVE_DAYS = 30
+
+# wallet ledger checkpoints and drift checks (python manage.py reconcile_wallets)
+WALLET_CHECKPOINT_EVERY = 100
+WALLET_CHECKPOINT_SETTLE_MINUTES = 10
@@ -0,0 +1,129 @@
+# my_site/shopper_middleware.py
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from cart.models import CartItem
+from profiles.models import Profile
+from wallet.models import Wallet
+from wishlist.models import Wishlist
+
+
+class Shopper:
+    """
+    Per-request bundle of the logged-in user's profile, cart summary,
+    wallet and wishlist ids, fetched together in one query on first use.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def _row(self):
+        User = get_user_model()
+
+        cart_lines = (
+            CartItem.objects
+            .filter(cart__user=OuterRef('pk'))
+            .order_by()
+            .values('cart__user')
+        )
+        wishlist_ids = (
+            Wishlist.objects
+            .filter(user=OuterRef('pk'))
+            .order_by()
+            .values('user')
+            .annotate(ids=ArrayAgg('variant_id'))
+            .values('ids')
+        )
+
+        return (
+            User.objects
+            .select_related('profile', 'wallet', 'cart')
+            .annotate(
+                shopper_cart_count=Subquery(
+                    cart_lines.annotate(n=Count('pk')).values('n')
+                ),
+                shopper_cart_quantity=Subquery(
+                    cart_lines.annotate(q=Sum('quantity')).values('q')
+                ),
+                shopper_wishlist_ids=Subquery(wishlist_ids),
+            )
+            .get(pk=self.user.pk)
+        )
+
+    def _related(self, name):
+        try:
+            return getattr(self._row, name)
+        except ObjectDoesNotExist:
+            return None
+
+    @cached_property
+    def profile(self):
+        profile = self._related('profile')
+        if profile is None:
+            profile, _ = Profile.objects.get_or_create(user=self.user)
+        return profile
+
+    @cached_property
+    def wallet(self):
+        wallet = self._related('wallet')
+        if wallet is None:
+            wallet, _ = Wallet.objects.get_or_create(
+                user=self.user,
+                defaults={'balance': 0}
+            )
+        return wallet
+
+    @property
+    def wallet_balance(self):
+        return self.wallet.balance
+
+    @property
+    def cart(self):
+        return self._related('cart')
+
+    @property
+    def cart_count(self):
+        # distinct items, not total quantity
+        return self._row.shopper_cart_count or 0
+
+    @property
+    def cart_quantity(self):
+        return self._row.shopper_cart_quantity or 0
+
+    @cached_property
+    def wishlist_variant_ids(self):
+        return set(self._row.shopper_wishlist_ids or [])
+
+    @property
+    def wishlist_count(self):
+        return len(self.wishlist_variant_ids)
+
+
+class AnonymousShopper:
+    profile = None
+    wallet = None
+    wallet_balance = 0
+    cart = None
+    cart_count = 0
+    cart_quantity = 0
+    wishlist_variant_ids = frozenset()
+    wishlist_count = 0
+
+
+def get_shopper(request):
+    if request.user.is_authenticated:
+        return Shopper(request.user)
+    return AnonymousShopper()
+
+
+class ShopperMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.shopper = SimpleLazyObject(lambda: get_shopper(request))
+        return self.get_response(request)
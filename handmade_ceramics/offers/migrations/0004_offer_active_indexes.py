@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0003_alter_categoryoffer_discount_percentage_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productoffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'start_date', 'end_date'], name='offers_product_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='categoryoffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'start_date', 'end_date'], name='offers_category_active_idx'),
+        ),
+    ]
@@ -87,6 +87,13 @@ class ProductOffer(OfferBase):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['product', 'start_date', 'end_date'],
+                name='offers_product_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def clean(self):
         super().validate_dates()
@@ -109,6 +116,13 @@ class CategoryOffer(OfferBase):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['category', 'start_date', 'end_date'],
+                name='offers_category_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def clean(self):
         super().validate_dates()
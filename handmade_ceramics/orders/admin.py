@@ -1,7 +1,10 @@
 # orders/admin.py
 
-from django.contrib import admin
-from .models import Order, OrderItem
+from django.conf import settings
+from django.contrib import admin, messages
+from .models import ArchivedOrder, Order, OrderEvent, OrderItem
+from .services.order_service import OrderService
+from .services.return_service import ReturnService
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -9,10 +12,88 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     can_delete = False
 
+class OrderEventInline(admin.TabularInline):
+    model = OrderEvent
+    fields = ('created_at', 'event_type', 'from_status', 'to_status', 'relayed_at', 'attempts', 'last_error')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+def _bulk_status_action(new_status):
+
+    def action(modeladmin, request, queryset):
+        changed, failures = OrderService.bulk_change_status(
+            queryset.values_list('order_id', flat=True), new_status
+        )
+        modeladmin.message_user(
+            request, f"{len(changed)} order(s) marked {new_status}."
+        )
+        for order_id, reason in failures:
+            modeladmin.message_user(request, f"{order_id}: {reason}", messages.ERROR)
+
+    action.__name__ = f"mark_{new_status.lower()}"
+    action.short_description = f"Mark selected orders {new_status.replace('_', ' ').lower()}"
+    return action
+
+
+@admin.action(description="Download invoices and packing slips (confirmed orders)")
+def export_dispatch(modeladmin, request, queryset):
+    from .admin_views import dispatch_export_response
+
+    limit = getattr(settings, 'DISPATCH_EXPORT_MAX_ORDERS', 500)
+    orders = list(
+        queryset.filter(status='CONFIRMED')
+        .prefetch_related('items')
+        .order_by('created_at')[:limit + 1]
+    )
+    if not orders:
+        modeladmin.message_user(request, "No confirmed orders selected.", messages.WARNING)
+        return None
+    if len(orders) > limit:
+        modeladmin.message_user(
+            request, f"Export at most {limit} orders at a time.", messages.ERROR
+        )
+        return None
+    return dispatch_export_response(orders)
+
+
+def _bulk_return_action(method, verb):
+
+    def action(modeladmin, request, queryset):
+        done, failures = method(queryset.values_list('order_id', flat=True))
+        modeladmin.message_user(request, f"{len(done)} return(s) {verb}.")
+        for order_id, reason in failures:
+            modeladmin.message_user(request, f"{order_id}: {reason}", messages.ERROR)
+
+    action.__name__ = method.__name__
+    action.short_description = f"Returns: mark selected {verb}"
+    return action
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_id', 'user', 'total_amount', 'status', 'created_at')
     search_fields = ('order_id', 'user__username', 'shipping_full_name', 'shipping_phone')
     list_filter = ('status', 'payment_method', 'created_at')
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderEventInline]
     readonly_fields = ('order_id', 'created_at', 'updated_at')
+    actions = [
+        _bulk_status_action(status) for status in OrderService.BULK_STATUS_TARGETS
+    ] + [
+        export_dispatch,
+        _bulk_return_action(ReturnService.bulk_approve_returns, 'approved'),
+        _bulk_return_action(ReturnService.bulk_complete_returns, 'completed'),
+    ]
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('order_id', 'user', 'total_amount', 'created_at', 'archived_at')
+    search_fields = ('order_id', 'user__username')
+    readonly_fields = ('order_id', 'user', 'total_amount', 'created_at', 'archived_at', 'data')
+
+    def has_add_permission(self, request):
+        return False
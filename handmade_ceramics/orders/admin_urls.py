@@ -8,6 +8,9 @@ urlpatterns = [
 
     # Static routes
     path('inventory/list/', admin_views.admin_inventory, name='admin_inventory'),
+    path('bulk/status/', admin_views.admin_bulk_order_status, name='admin_bulk_order_status'),
+    path('bulk/returns/', admin_views.admin_bulk_returns, name='admin_bulk_returns'),
+    path('dispatch/export/', admin_views.admin_dispatch_export, name='admin_dispatch_export'),
     path('return/approve/<int:item_id>/', admin_views.approve_item_return, name='approve_item_return'),
     path('return/reject/<int:item_id>/',  admin_views.reject_item_return,  name='reject_item_return'),
 
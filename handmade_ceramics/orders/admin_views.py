@@ -3,11 +3,11 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q
 from django.contrib import messages
 from django.urls import reverse
 from django.utils import timezone
 from django.db import transaction
+from datetime import date, datetime, time, timedelta
 
 from .models import Order, OrderItem
 from product_management.models import Variant
@@ -15,12 +15,22 @@ from wallet.models import Wallet, WalletTransaction
 
 from orders.services.return_service import ReturnService
 from orders.services.order_service import OrderService
+from orders.services.reservation_service import ReservationService
+from product_management.services import InsufficientStock
+from orders.dispatch_export import export_dispatch_zip
+from django.conf import settings
+from django.http import StreamingHttpResponse
 
 
 def superuser_check(user):
     return user.is_active and user.is_superuser
 
 
+def _local_day_start(value):
+    day = date.fromisoformat(value[:10])
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 @login_required(login_url='custom_admin:login')
 @user_passes_test(superuser_check, login_url='custom_admin:login')
 def admin_order_list(request):
@@ -29,12 +39,8 @@ def admin_order_list(request):
 
     q = request.GET.get('q', '').strip()
     if q:
-        orders = orders.filter(
-            Q(order_id__icontains=q) |
-            Q(user__email__icontains=q) |
-            Q(user__first_name__icontains=q) |
-            Q(user__last_name__icontains=q)
-        )
+        # served by the trigram index on the lowercased search column
+        orders = orders.filter(search_document__contains=q.lower())
 
     status = request.GET.get('status', '')
     if status:
@@ -43,17 +49,19 @@ def admin_order_list(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
 
+    # half-open [start of date_from, start of day after date_to) in the
+    # site timezone, so the created_at indexes can be used
     if date_from:
         try:
-            dt_from = timezone.datetime.fromisoformat(date_from)
-            orders = orders.filter(created_at__date__gte=dt_from.date())
+            start = _local_day_start(date_from)
+            orders = orders.filter(created_at__gte=start)
         except ValueError:
             pass
 
     if date_to:
         try:
-            dt_to = timezone.datetime.fromisoformat(date_to)
-            orders = orders.filter(created_at__date__lte=dt_to.date())
+            end = _local_day_start(date_to) + timedelta(days=1)
+            orders = orders.filter(created_at__lt=end)
         except ValueError:
             pass
 
@@ -92,6 +100,11 @@ def admin_order_list(request):
         'date_from': date_from,
         'date_to': date_to,
         'sort': sort,
+        'bulk_status_choices': [
+            (code, label)
+            for code, label in Order._meta.get_field('status').choices
+            if code in OrderService.BULK_STATUS_TARGETS
+        ],
     }
 
     return render(request, 'orders/admin_order_list.html', context)
@@ -125,6 +138,22 @@ def admin_order_detail(request, order_id):
                 )
             )
 
+        if order.status == 'PENDING':
+            try:
+                with transaction.atomic():
+                    ReservationService.settle_for_status(order, new_status)
+            except InsufficientStock:
+                messages.error(
+                    request,
+                    "Some items of this order are out of stock."
+                )
+                return redirect(
+                    reverse(
+                        'custom_admin:orders_admin:admin_order_detail',
+                        args=[order.order_id]
+                    )
+                )
+
         old_status = order.status
         order.status = new_status
 
@@ -163,6 +192,7 @@ def admin_order_detail(request, order_id):
     context = {
         'order': order,
         'items': items,
+        'events': order.events.all(),
         'status_choices': Order._meta.get_field('status').choices,
     }
 
@@ -221,11 +251,11 @@ def admin_verify_return(request, order_id):
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q
 from django.contrib import messages
 from django.urls import reverse
 from django.utils import timezone
 from django.db import transaction
+from datetime import date, datetime, time, timedelta
 
 from .models import Order, OrderItem
 from product_management.models import Variant
@@ -233,12 +263,22 @@ from wallet.models import Wallet, WalletTransaction
 
 from orders.services.return_service import ReturnService
 from orders.services.order_service import OrderService
+from orders.services.reservation_service import ReservationService
+from product_management.services import InsufficientStock
+from orders.dispatch_export import export_dispatch_zip
+from django.conf import settings
+from django.http import StreamingHttpResponse
 
 
 def superuser_check(user):
     return user.is_active and user.is_superuser
 
 
+def _local_day_start(value):
+    day = date.fromisoformat(value[:10])
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 @login_required(login_url='custom_admin:login')
 @user_passes_test(superuser_check, login_url='custom_admin:login')
 def admin_order_list(request):
@@ -247,12 +287,8 @@ def admin_order_list(request):
 
     q = request.GET.get('q', '').strip()
     if q:
-        orders = orders.filter(
-            Q(order_id__icontains=q) |
-            Q(user__email__icontains=q) |
-            Q(user__first_name__icontains=q) |
-            Q(user__last_name__icontains=q)
-        )
+        # served by the trigram index on the lowercased search column
+        orders = orders.filter(search_document__contains=q.lower())
 
     status = request.GET.get('status', '')
     if status:
@@ -261,17 +297,19 @@ def admin_order_list(request):
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
 
+    # half-open [start of date_from, start of day after date_to) in the
+    # site timezone, so the created_at indexes can be used
     if date_from:
         try:
-            dt_from = timezone.datetime.fromisoformat(date_from)
-            orders = orders.filter(created_at__date__gte=dt_from.date())
+            start = _local_day_start(date_from)
+            orders = orders.filter(created_at__gte=start)
         except ValueError:
             pass
 
     if date_to:
         try:
-            dt_to = timezone.datetime.fromisoformat(date_to)
-            orders = orders.filter(created_at__date__lte=dt_to.date())
+            end = _local_day_start(date_to) + timedelta(days=1)
+            orders = orders.filter(created_at__lt=end)
         except ValueError:
             pass
 
@@ -310,6 +348,11 @@ def admin_order_list(request):
         'date_from': date_from,
         'date_to': date_to,
         'sort': sort,
+        'bulk_status_choices': [
+            (code, label)
+            for code, label in Order._meta.get_field('status').choices
+            if code in OrderService.BULK_STATUS_TARGETS
+        ],
     }
 
     return render(request, 'orders/admin_order_list.html', context)
@@ -343,6 +386,22 @@ def admin_order_detail(request, order_id):
                 )
             )
 
+        if order.status == 'PENDING':
+            try:
+                with transaction.atomic():
+                    ReservationService.settle_for_status(order, new_status)
+            except InsufficientStock:
+                messages.error(
+                    request,
+                    "Some items of this order are out of stock."
+                )
+                return redirect(
+                    reverse(
+                        'custom_admin:orders_admin:admin_order_detail',
+                        args=[order.order_id]
+                    )
+                )
+
         old_status = order.status
         order.status = new_status
 
@@ -381,6 +440,7 @@ def admin_order_detail(request, order_id):
     context = {
         'order': order,
         'items': items,
+        'events': order.events.all(),
         'status_choices': Order._meta.get_field('status').choices,
     }
 
@@ -602,4 +662,129 @@ def admin_cancel_order(request, order_id):
     return redirect(
         'custom_admin:orders_admin:admin_order_detail',
         order_id=order.order_id
-    )
\ No newline at end of file
+    )
+
+@login_required(login_url='custom_admin:login')
+@user_passes_test(superuser_check, login_url='custom_admin:login')
+@require_POST
+def admin_bulk_order_status(request):
+
+    order_ids = request.POST.getlist('order_ids')
+    new_status = request.POST.get('status')
+
+    back = reverse('custom_admin:orders_admin:admin_order_list')
+    if request.POST.get('next', '').startswith(back):
+        back = request.POST['next']
+
+    if not order_ids:
+        messages.error(request, "Select at least one order.")
+        return redirect(back)
+
+    changed, failures = OrderService.bulk_change_status(order_ids, new_status)
+
+    if changed:
+        messages.success(
+            request,
+            f"{len(changed)} order(s) moved to "
+            f"{new_status.replace('_', ' ').title()}."
+        )
+
+    for order_id, reason in failures:
+        messages.error(request, f"{order_id}: {reason}.")
+
+    return redirect(back)
+
+
+@login_required(login_url='custom_admin:login')
+@user_passes_test(superuser_check, login_url='custom_admin:login')
+@require_POST
+def admin_bulk_returns(request):
+
+    order_ids = request.POST.getlist('order_ids')
+    action = request.POST.get('return_action')
+
+    back = reverse('custom_admin:orders_admin:admin_order_list')
+    if request.POST.get('next', '').startswith(back):
+        back = request.POST['next']
+
+    if not order_ids:
+        messages.error(request, "Select at least one order.")
+        return redirect(back)
+
+    if action == 'approve':
+        done, failures = ReturnService.bulk_approve_returns(order_ids)
+        if done:
+            messages.success(request, f"{len(done)} return(s) approved.")
+
+    elif action == 'complete':
+        done, failures = ReturnService.bulk_complete_returns(order_ids)
+        if done:
+            messages.success(
+                request,
+                f"{len(done)} return(s) completed and refunded to wallets."
+            )
+
+    else:
+        messages.error(request, "Unknown return action.")
+        return redirect(back)
+
+    for order_id, reason in failures:
+        messages.error(request, f"{order_id}: {reason}.")
+
+    return redirect(back)
+
+
+def dispatch_export_response(orders):
+    response = StreamingHttpResponse(
+        export_dispatch_zip(orders),
+        content_type='application/zip',
+    )
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="dispatch-{stamp}.zip"'
+    return response
+
+
+@login_required(login_url='custom_admin:login')
+@user_passes_test(superuser_check, login_url='custom_admin:login')
+def admin_dispatch_export(request):
+    """
+    ZIP of invoices and packing slips for confirmed orders: the orders
+    ticked on the list page (POST) or a created date range (GET).
+    """
+    orders = Order.objects.filter(status='CONFIRMED')
+
+    if request.method == 'POST':
+        orders = orders.filter(order_id__in=request.POST.getlist('order_ids'))
+    else:
+        date_from = request.GET.get('date_from', '')
+        date_to = request.GET.get('date_to', '')
+
+        if not date_from and not date_to:
+            messages.error(request, "Choose a date range or select orders to export.")
+            return redirect('custom_admin:orders_admin:admin_order_list')
+
+        try:
+            if date_from:
+                orders = orders.filter(created_at__gte=_local_day_start(date_from))
+            if date_to:
+                orders = orders.filter(
+                    created_at__lt=_local_day_start(date_to) + timedelta(days=1)
+                )
+        except ValueError:
+            messages.error(request, "Invalid date.")
+            return redirect('custom_admin:orders_admin:admin_order_list')
+
+    limit = getattr(settings, 'DISPATCH_EXPORT_MAX_ORDERS', 500)
+    orders = list(
+        orders.prefetch_related('items').order_by('created_at')[:limit + 1]
+    )
+
+    if not orders:
+        messages.error(request, "No confirmed orders to export.")
+        return redirect('custom_admin:orders_admin:admin_order_list')
+
+    if len(orders) > limit:
+        messages.error(request, f"Export at most {limit} orders at a time.")
+        return redirect('custom_admin:orders_admin:admin_order_list')
+
+    return dispatch_export_response(orders)
@@ -0,0 +1,94 @@
+# orders/consumers.py
+
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+
+from .events import order_event_consumer
+from .invoices import schedule_invoice
+from .models import Order
+
+logger = logging.getLogger(__name__)
+
+# status changes the customer is emailed about
+CUSTOMER_EMAIL_STATUSES = {
+    'SHIPPED': "has been shipped",
+    'OUT_FOR_DELIVERY': "is out for delivery",
+    'DELIVERED': "has been delivered",
+    'CANCELLED': "has been cancelled",
+    'RETURNED': "has been returned",
+}
+
+
+def _orders_for(events):
+    return Order.objects.in_bulk({event.order_id for event in events})
+
+
+@order_event_consumer('invoices')
+def prerender_invoices(events):
+    # pending orders are not invoiced yet; every later change gets a
+    # fresh PDF rendered in the background
+    for order in _orders_for(events).values():
+        if order.status != 'PENDING':
+            schedule_invoice(order)
+
+
+@order_event_consumer('customer_emails')
+def email_customers(events):
+    if not getattr(settings, 'ORDER_STATUS_EMAILS', True):
+        return
+
+    wanted = [
+        event for event in events
+        if (event.event_type == 'STATUS_CHANGED'
+            and event.to_status in CUSTOMER_EMAIL_STATUSES)
+        or event.event_type == 'REFUNDED'
+    ]
+    if not wanted:
+        return
+
+    orders = _orders_for(wanted)
+    messages = []
+
+    for event in wanted:
+        order = orders.get(event.order_id)
+        if order is None or not order.shipping_email:
+            continue
+
+        if event.event_type == 'REFUNDED':
+            subject = f"Refund issued for order {order.order_id}"
+            body = (
+                f"Hi {order.shipping_full_name},\n\nThe refund for order "
+                f"{order.order_id} has been credited to your wallet.\n"
+            )
+        else:
+            what = CUSTOMER_EMAIL_STATUSES[event.to_status]
+            subject = f"Your order {order.order_id} {what}"
+            body = (
+                f"Hi {order.shipping_full_name},\n\nYour order "
+                f"{order.order_id} {what}.\n"
+            )
+
+        messages.append(EmailMessage(
+            subject, body, settings.DEFAULT_FROM_EMAIL, [order.shipping_email]
+        ))
+
+    if not messages:
+        return
+
+    # only send once the batch is marked relayed
+    transaction.on_commit(lambda: _send(messages))
+
+
+def _send(messages):
+    # the batch is already marked relayed, so a failure can only be logged
+    try:
+        with get_connection(fail_silently=False) as connection:
+            connection.send_messages(messages)
+    except Exception:
+        logger.exception(
+            "Could not send order status emails: %s",
+            ", ".join(message.subject for message in messages)
+        )
@@ -0,0 +1,218 @@
+# orders/events.py
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Order fields whose changes are recorded as OrderEvents
+TRACKED_FIELDS = ('status', 'is_paid', 'is_refunded', 'total_amount')
+
+_consumers = {}
+
+_relay_lock = threading.Lock()
+_relay_wanted = threading.Event()
+
+
+def snapshot(order, update_fields=None, before=None):
+    """
+    The tracked fields as they are on `order`. When a save only writes
+    `update_fields`, the other fields keep their `before` value.
+    """
+    state = {}
+    for field in TRACKED_FIELDS:
+        if update_fields is not None and field not in update_fields:
+            state[field] = (before or {}).get(field)
+        else:
+            state[field] = order.__dict__.get(field)
+    return state
+
+
+def events_for_change(order, before, after):
+    """
+    Unsaved OrderEvents describing the move from `before` to `after`
+    (both snapshot dicts). before=None means the order was just created.
+    """
+    from .models import OrderEvent
+
+    data = {
+        'total_amount': str(after['total_amount']),
+        'created_on': timezone.localdate(order.created_at).isoformat(),
+    }
+
+    def event(event_type, to_status, from_status='', **extra):
+        return OrderEvent(
+            order_id=order.pk,
+            event_type=event_type,
+            from_status=from_status or '',
+            to_status=to_status,
+            data=dict(data, **extra),
+        )
+
+    if before is None:
+        return [event('CREATED', after['status'])]
+
+    events = []
+
+    # totals first, against the old status, so consumers keeping per-status
+    # sums can apply the events in any order
+    if before['total_amount'] != after['total_amount']:
+        events.append(event(
+            'TOTALS_CHANGED', before['status'],
+            previous_total=str(before['total_amount']),
+        ))
+
+    if before['status'] != after['status']:
+        events.append(event('STATUS_CHANGED', after['status'], before['status']))
+
+    if after['is_paid'] and not before['is_paid']:
+        events.append(event('PAID', after['status']))
+
+    if after['is_refunded'] and not before['is_refunded']:
+        events.append(event('REFUNDED', after['status']))
+
+    return events
+
+
+def record_bulk_update(orders, **changes):
+    """
+    Record events for `orders`, loaded with the tracked fields, after a
+    queryset update() applied the same `changes` to all of them.
+    """
+    events = []
+    for order in orders:
+        before = snapshot(order)
+        events += events_for_change(order, before, dict(before, **changes))
+    record_events(events)
+
+
+def record_events(events):
+    """
+    Insert events in the caller's transaction and wake the relay once
+    it commits.
+    """
+    from .models import OrderEvent
+
+    if not events:
+        return
+
+    OrderEvent.objects.bulk_create(events)
+
+    if getattr(settings, 'ORDER_EVENTS_RELAY_ASYNC', True):
+        transaction.on_commit(_wake_relay)
+
+
+def order_event_consumer(name):
+    """
+    Register func(events) to receive relayed OrderEvents in batches.
+    It runs inside the relay's transaction: database writes commit
+    together with the batch being marked relayed, and anything outside
+    the database should be deferred with transaction.on_commit.
+    """
+    def register(func):
+        _consumers[name] = func
+        return func
+    return register
+
+
+def _deliver(events):
+    for func in _consumers.values():
+        func(events)
+
+
+def _max_attempts():
+    return getattr(settings, 'ORDER_EVENTS_MAX_ATTEMPTS', 5)
+
+
+def relay_pending_events(batch_size=None):
+    """
+    Hand unrelayed events to every consumer, oldest first, in batches.
+    Rows locked by a concurrent relay are skipped. If a batch fails, its
+    events are retried one by one so a single bad event only holds back
+    itself; it is given up after ORDER_EVENTS_MAX_ATTEMPTS tries.
+    Returns the number of events relayed.
+    """
+    from .models import OrderEvent
+
+    batch_size = batch_size or getattr(settings, 'ORDER_EVENTS_BATCH_SIZE', 200)
+    relayed = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                OrderEvent.objects
+                .select_for_update(skip_locked=True)
+                .filter(relayed_at__isnull=True, attempts__lt=_max_attempts())
+                .order_by('pk')[:batch_size]
+            )
+            if not batch:
+                break
+
+            try:
+                with transaction.atomic():
+                    _deliver(batch)
+                done = batch
+            except Exception:
+                logger.exception("Order event batch failed, retrying one by one")
+                done = _deliver_one_by_one(batch)
+
+            OrderEvent.objects.filter(
+                pk__in=[event.pk for event in done]
+            ).update(relayed_at=timezone.now())
+
+        relayed += len(done)
+
+        if len(done) < len(batch):
+            # leave the failed events for the next run
+            break
+
+    return relayed
+
+
+def _deliver_one_by_one(batch):
+    from .models import OrderEvent
+
+    done = []
+
+    for event in batch:
+        try:
+            with transaction.atomic():
+                _deliver([event])
+        except Exception as exc:
+            logger.exception("Order event %s failed", event.pk)
+            OrderEvent.objects.filter(pk=event.pk).update(
+                attempts=event.attempts + 1,
+                last_error=repr(exc)[:2000],
+            )
+        else:
+            done.append(event)
+
+    return done
+
+
+def _wake_relay():
+    _relay_wanted.set()
+
+    # one relay thread per process; a running one picks up the new events
+    if _relay_lock.acquire(blocking=False):
+        threading.Thread(target=_relay_in_thread, daemon=True).start()
+
+
+def _relay_in_thread():
+    try:
+        while _relay_wanted.is_set():
+            _relay_wanted.clear()
+            relay_pending_events()
+    except Exception:
+        logger.exception("Order event relay failed")
+    finally:
+        close_old_connections()
+        _relay_lock.release()
+
+    # events committed while we were shutting down
+    if _relay_wanted.is_set():
+        _wake_relay()
@@ -0,0 +1,203 @@
+# orders/invoices.py
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.template.loader import render_to_string
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def invoice_dir():
+    return getattr(
+        settings,
+        'INVOICE_CACHE_DIR',
+        os.path.join(settings.BASE_DIR, 'invoice_cache')
+    )
+
+
+def render_invoice_html(order):
+    items = list(order.items.all())
+
+    for item in items:
+        item.item_total = item.unit_price * item.quantity
+
+    subtotal = order.subtotal or sum(item.item_total for item in items)
+    discount = order.discount_amount or 0
+    tax      = order.tax_amount or 0
+    shipping = order.shipping_charge or 0
+
+    return render_to_string("orders/invoice.html", {
+        "order":    order,
+        "items":    items,
+        "subtotal": subtotal,
+        "discount": discount,
+        "tax":      tax,
+        "shipping": shipping,
+        "total":    order.total_amount,
+    })
+
+
+def invoice_path(order, html):
+    """
+    <dir>/<order_id>/<sha256 of the invoice html>.pdf: any change to the
+    order's totals, items or status gives a new file name, and each
+    order's versions share a directory of their own.
+    """
+    digest = hashlib.sha256(html.encode()).hexdigest()[:16]
+    return os.path.join(invoice_dir(), order.order_id, f"{digest}.pdf")
+
+
+def get_invoice(order):
+    """
+    Path of the order's current invoice PDF, rendering it first if the
+    cache has no copy for this version of the order.
+    """
+    html = render_invoice_html(order)
+    path = invoice_path(order, html)
+
+    if not os.path.exists(path):
+        _write_pdf(order, html, path)
+
+    return path
+
+
+def open_invoice(order):
+    """
+    The order's current invoice PDF as an open binary file. Renders it if
+    the cache has no copy, or if the copy was swapped out for a newer
+    version between the lookup and the open.
+    """
+    html = render_invoice_html(order)
+    path = invoice_path(order, html)
+
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        pass
+
+    data = html_to_pdf(html)
+    store_invoice_pdf(order, data, path)
+    return io.BytesIO(data)
+
+
+def html_to_pdf(html):
+    """Pool-safe: turns HTML into PDF bytes without touching the database."""
+    import weasyprint
+    return weasyprint.HTML(string=html).write_pdf()
+
+
+def _write_pdf(order, html, path):
+    store_invoice_pdf(order, html_to_pdf(html), path)
+
+
+def store_invoice_pdf(order, data, path):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    # write next to the target and rename, so readers never see half a file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # drop invoices rendered for earlier versions of the order; the
+    # directory only ever holds this order's files
+    for name in os.listdir(directory):
+        stale = os.path.join(directory, name)
+        if name.endswith('.pdf') and stale != path:
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+
+
+def render_invoice(order_pk):
+    """Pool entry point: make sure the order's current invoice is cached."""
+    from orders.models import Order
+
+    close_old_connections()
+    try:
+        order = Order.objects.filter(pk=order_pk).first()
+        if order:
+            get_invoice(order)
+    finally:
+        close_old_connections()
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_executor():
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn rather than fork so workers never share the
+                # parent's database connections
+                _executor = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'INVOICE_WORKERS', 2),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+    return _executor
+
+
+def _reset_executor(broken):
+    """Drop a pool that lost a worker; the next get_executor() starts anew."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def submit(fn, *args):
+    """
+    Submit `fn` to the invoice pool. A pool broken by a crashed worker
+    (e.g. WeasyPrint killed for memory) refuses all work, so it is
+    replaced and the submit retried once.
+    """
+    executor = get_executor()
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning("Invoice pool broken, starting a new one")
+        _reset_executor(executor)
+        return get_executor().submit(fn, *args)
+
+
+def schedule_invoice(order):
+    """Render the invoice in the background once the transaction commits."""
+    if not getattr(settings, 'INVOICE_RENDER_ASYNC', True):
+        return
+
+    order_pk = order.pk
+
+    def queue():
+        try:
+            submit(render_invoice, order_pk)
+        except Exception:
+            logger.exception("Could not queue invoice for order %s", order_pk)
+
+    transaction.on_commit(queue)
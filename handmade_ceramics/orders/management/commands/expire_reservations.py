@@ -0,0 +1,20 @@
+# orders/management/commands/expire_reservations.py
+
+from django.core.management.base import BaseCommand
+
+from orders.services.reservation_service import ReservationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Return stock held for unpaid online orders once their "
+        "reservation passes STOCK_RESERVATION_TTL_MINUTES. Run from cron "
+        "every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        expired = ReservationService.expire_stale(options['batch_size'])
+        self.stdout.write(f"Expired {expired} stock reservations.")
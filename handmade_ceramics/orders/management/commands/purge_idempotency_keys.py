@@ -0,0 +1,16 @@
+# orders/management/commands/purge_idempotency_keys.py
+
+from django.core.management.base import BaseCommand
+
+from orders.services.idempotency_service import IdempotencyService
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys older than IDEMPOTENCY_KEY_TTL_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None)
+
+    def handle(self, *args, **options):
+        deleted = IdempotencyService.purge(options['days'])
+        self.stdout.write(f"Deleted {deleted} idempotency keys.")
@@ -0,0 +1,21 @@
+# orders/management/commands/relay_order_events.py
+
+from django.core.management.base import BaseCommand
+
+from orders.events import relay_pending_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver unrelayed order events to their consumers (report "
+        "rollups, customer emails, invoice pre-rendering). Run from cron "
+        "as a safety net, or as the only relay when ORDER_EVENTS_RELAY_ASYNC "
+        "is off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        relayed = relay_pending_events(options['batch_size'])
+        self.stdout.write(f"Relayed {relayed} order events.")
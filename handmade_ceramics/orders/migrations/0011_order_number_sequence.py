@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_stockreservation'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS orders_order_number_seq START 1;",
+            "DROP SEQUENCE IF EXISTS orders_order_number_seq;",
+        ),
+    ]
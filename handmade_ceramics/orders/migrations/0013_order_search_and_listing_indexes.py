@@ -0,0 +1,47 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat, Lower
+
+
+def fill_search_document(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.update(
+        search_document=Lower(Concat(
+            'order_id', Value(' '),
+            'shipping_full_name', Value(' '),
+            'shipping_email', Value(' '),
+            'shipping_phone',
+            output_field=models.TextField(),
+        ))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='order',
+            name='search_document',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_document, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='orders_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='orders_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='orders_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
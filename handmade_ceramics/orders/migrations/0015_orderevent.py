@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_order_user_created_and_item_status_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('CREATED', 'Created'), ('STATUS_CHANGED', 'Status changed'), ('TOTALS_CHANGED', 'Totals changed'), ('PAID', 'Paid'), ('REFUNDED', 'Refunded')], max_length=30)),
+                ('from_status', models.CharField(blank=True, max_length=30)),
+                ('to_status', models.CharField(max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('relayed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='orders.order')),
+            ],
+            options={
+                'ordering': ['created_at', 'pk'],
+                'indexes': [models.Index(fields=['order', 'created_at'], name='orders_event_order_idx'), models.Index(condition=models.Q(('relayed_at__isnull', True)), fields=['id'], name='orders_event_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0016_archivedorder'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderevent',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='orders.order'),
+        ),
+    ]
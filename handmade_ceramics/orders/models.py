@@ -1,10 +1,13 @@
-from django.db import models, transaction
+from django.db import models, transaction, connection
+from django.contrib.postgres.indexes import GinIndex
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.urls import reverse
-from django.utils.crypto import get_random_string
 from coupons.models import Coupon
 from product_management.models import Variant, Product
+from product_management.services import restore_stock
 from decimal import Decimal
 
 User = get_user_model()
@@ -21,6 +24,13 @@ ORDER_STATUS_CHOICES = [
     ('PARTIAL_RETURN_REQUESTED', 'Partial return requested'),
 ]
 
+INACTIVE_ITEM_STATUSES = ['CANCELLED', 'RETURNED']
+
+# cancellation_reason of online orders whose payment never completed
+ABANDONED_ORDER_REASON = "Payment not completed"
+# ... and of paid ones whose stock hold lapsed and could not be retaken
+OUT_OF_STOCK_REASON = "Items went out of stock before payment completed"
+
 ITEM_STATUS_CHOICES = [
     ('PENDING', 'Pending'),
     ('CONFIRMED', 'Confirmed'),
@@ -33,10 +43,30 @@ ITEM_STATUS_CHOICES = [
 ]
 
 
+ORDER_NUMBER_SEQUENCE = 'orders_order_number_seq'
+ORDER_NUMBER_WIDTH = 6
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _base36(number, width):
+    digits = ''
+    while number:
+        number, rem = divmod(number, 36)
+        digits = BASE36[rem] + digits
+    return digits.rjust(width, '0')
+
+
 def generate_order_id():
+    """
+    ORD<yyyymmdd>-<n> where n is the next value of a database sequence in
+    fixed-width base36, so ids never collide and sort in creation order.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(%s)", [ORDER_NUMBER_SEQUENCE])
+        number = cursor.fetchone()[0]
+
     date_part = timezone.now().strftime('%Y%m%d')
-    random_part = get_random_string(6).upper()
-    return f"ORD{date_part}-{random_part}"
+    return f"ORD{date_part}-{_base36(number, ORDER_NUMBER_WIDTH)}"
 
 
 class Order(models.Model):
@@ -72,22 +102,64 @@ class Order(models.Model):
 
     coupon = models.ForeignKey(Coupon, on_delete=models.SET_NULL, null=True, blank=True)
 
+    # lowercased order id, shipping name, email and phone for admin search
+    search_document = models.TextField(default='', editable=False)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='orders_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='orders_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='orders_user_created_idx'),
+            GinIndex(
+                fields=['search_document'],
+                name='orders_search_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what we loaded so save() can record the change as events
+        from .events import snapshot
+        instance._loaded_state = snapshot(instance)
+        return instance
 
     def get_absolute_url(self):
         return reverse('orders:order_detail', args=[self.order_id])
 
+    def build_search_document(self):
+        parts = [
+            self.order_id,
+            self.shipping_full_name,
+            self.shipping_email,
+            self.shipping_phone,
+        ]
+        return ' '.join(part for part in parts if part).lower()
+
     def save(self, *args, **kwargs):
         if not self.order_id:
-            for _ in range(5):
-                candidate = generate_order_id()
-                if not Order.objects.filter(order_id=candidate).exists():
-                    self.order_id = candidate
-                    break
-            else:
-                self.order_id = generate_order_id()
-        super().save(*args, **kwargs)
+            self.order_id = generate_order_id()
+        self.search_document = self.build_search_document()
+
+        from .events import events_for_change, record_events, snapshot
+
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        before = None if adding else getattr(self, '_loaded_state', None)
+        after = snapshot(self, update_fields, before)
+
+        if not adding and (before is None or before == after):
+            super().save(*args, **kwargs)
+            return
+
+        # the event rows commit or roll back together with the change
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            record_events(events_for_change(self, before, after))
+
+        self._loaded_state = after
         
     def can_change_status(self, new_status):
         allowed_transitions = {
@@ -104,28 +176,35 @@ class Order(models.Model):
         return new_status in allowed_transitions.get(self.status, [])
 
     
-    def recalculate_totals(self):
-        items = self.items.exclude(
-            item_status__in=['CANCELLED', 'RETURNED']
+    def item_totals(self):
+        """
+        Sums over the order's active (not cancelled/returned) items,
+        computed in one conditional aggregate.
+        """
+        active = ~models.Q(item_status__in=INACTIVE_ITEM_STATUSES)
+        zero = models.Value(Decimal("0.00"))
+
+        return self.items.aggregate(
+            subtotal=Coalesce(models.Sum('item_total', filter=active), zero),
+            discount=Coalesce(models.Sum('coupon_discount_amount', filter=active), zero),
+            final_total=Coalesce(models.Sum('final_total', filter=active), zero),
+            active_count=models.Count('pk', filter=active),
         )
 
-        subtotal = sum(
-            (item.item_total for item in items),
-            Decimal("0.00")
-        )
-
-        discount = sum(
-            (item.coupon_discount_amount for item in items),
-            Decimal("0.00")
-        )
+    def recalculate_totals(self):
+        totals = self.item_totals()
 
-        self.subtotal = subtotal
-        self.discount_amount = discount
+        self.subtotal = totals['subtotal']
+        self.discount_amount = totals['discount']
         self.total_amount = (
-            subtotal + self.tax_amount + self.shipping_charge - discount
+            totals['subtotal'] + self.tax_amount + self.shipping_charge
+            - totals['discount']
         )
 
-        self.save()
+        self.save(update_fields=[
+            'subtotal', 'discount_amount', 'total_amount', 'updated_at'
+        ])
+        return totals
 
 
 class OrderItem(models.Model):
@@ -149,6 +228,9 @@ class OrderItem(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['order', 'item_status'], name='orders_item_status_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         self.item_total = self.unit_price * self.quantity
@@ -159,10 +241,10 @@ class OrderItem(models.Model):
         OrderItemService.process_return(self)
 
     def cancel_item(self):
+        from orders.services.reservation_service import ReservationService
 
-        if self.variant:
-            self.variant.stock += self.quantity
-            self.variant.save()
+        if ReservationService.settle_for_cancel(self.order, [self.variant_id]):
+            restore_stock([(self.variant_id, self.quantity)])
 
         self.item_status = "CANCELLED"
         self.save()
@@ -170,16 +252,133 @@ class OrderItem(models.Model):
         order = self.order
 
         # Recalculate totals
-        order.recalculate_totals()
-
-        # Check if all items are cancelled/returned
-        remaining_items = order.items.exclude(
-            item_status__in=['CANCELLED', 'RETURNED']
-        )
+        totals = order.recalculate_totals()
 
         # If all items inactive,
         # mark order as cancelled
-        if not remaining_items.exists():
+        if not totals['active_count']:
             order.status = 'CANCELLED'
             order.total_amount = Decimal("0.00")
-            order.save(update_fields=['status','total_amount'])
\ No newline at end of file
+            order.save(update_fields=['status','total_amount'])
+
+RESERVATION_STATUS_CHOICES = [
+    ('HELD', 'Held'),
+    ('CONVERTED', 'Converted'),
+    ('RELEASED', 'Released'),
+    ('EXPIRED', 'Expired'),
+]
+
+
+class StockReservation(models.Model):
+    """
+    Stock taken from a variant for an unpaid online order. The quantity is
+    already subtracted from Variant.stock while HELD, so Variant.stock is
+    always the available-to-sell count.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='stock_reservations')
+    variant = models.ForeignKey(Variant, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=RESERVATION_STATUS_CHOICES, default='HELD')
+
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['expires_at'],
+                name='orders_reservation_held_idx',
+                condition=models.Q(status='HELD'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.order.order_id} | {self.variant_id} x {self.quantity} | {self.status}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    One row per client-supplied key. The first request inserts the row
+    and stores its result; repeats read the stored result back.
+    """
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    result = models.JSONField(null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'key'],
+                name='orders_idempotency_scope_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+
+ORDER_EVENT_TYPES = [
+    ('CREATED', 'Created'),
+    ('STATUS_CHANGED', 'Status changed'),
+    ('TOTALS_CHANGED', 'Totals changed'),
+    ('PAID', 'Paid'),
+    ('REFUNDED', 'Refunded'),
+]
+
+
+class ArchivedOrder(models.Model):
+    """
+    Abandoned (never paid) order moved out of the orders table. `data`
+    holds the order, its items, payments and events as they were.
+    """
+    order_id = models.CharField(max_length=40, unique=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_orders')
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.order_id} (archived)"
+
+
+class OrderEvent(models.Model):
+    """
+    Append-only history of an order, inserted in the same transaction as
+    the change it describes. relayed_at, attempts and last_error are the
+    outbox bookkeeping used by orders.events.relay_pending_events.
+    Events outlive an archived order, with `order` cleared, so ones not
+    yet relayed still reach the consumers.
+    """
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
+    event_type = models.CharField(max_length=30, choices=ORDER_EVENT_TYPES)
+    from_status = models.CharField(max_length=30, blank=True)
+    to_status = models.CharField(max_length=30)
+    data = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    relayed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'pk']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='orders_event_order_idx'),
+            models.Index(
+                fields=['id'],
+                name='orders_event_pending_idx',
+                condition=models.Q(relayed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} | {self.event_type} | {self.from_status} -> {self.to_status}"
@@ -0,0 +1,90 @@
+# orders/services/archive_service.py
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from orders.models import ArchivedOrder, Order, ABANDONED_ORDER_REASON
+from payments.models import Payment
+
+
+class OrderArchiveService:
+
+    @staticmethod
+    def abandoned_orders(older_than_days):
+        """
+        Abandoned orders untouched for `older_than_days`. Orders with a
+        payment still PENDING are left out: the reconciler has not been
+        able to settle it yet, and the gateway may still have taken the
+        money.
+        """
+        return Order.objects.filter(
+            status='CANCELLED',
+            is_paid=False,
+            cancellation_reason=ABANDONED_ORDER_REASON,
+            updated_at__lte=timezone.now() - timedelta(days=older_than_days),
+        ).exclude(Exists(
+            Payment.objects.filter(order=OuterRef('pk'), status='PENDING')
+        ))
+
+    @staticmethod
+    def archive_abandoned(older_than_days, chunk_size=200):
+        """
+        Move abandoned orders untouched for `older_than_days` into
+        ArchivedOrder and delete them with their items, payments and
+        holds. Their events are copied into the archive too, and stay
+        behind with no order so any still unrelayed are delivered.
+        Walks the orders in pk order, one short transaction per chunk.
+        Returns the number archived.
+        """
+        archived = 0
+        last_pk = 0
+
+        while True:
+            with transaction.atomic():
+                orders = list(
+                    OrderArchiveService.abandoned_orders(older_than_days)
+                    .select_for_update(skip_locked=True)
+                    .filter(pk__gt=last_pk)
+                    .prefetch_related('items', 'payments', 'events')
+                    .order_by('pk')[:chunk_size]
+                )
+                if not orders:
+                    break
+
+                last_pk = orders[-1].pk
+
+                ArchivedOrder.objects.bulk_create([
+                    ArchivedOrder(
+                        order_id=order.order_id,
+                        user_id=order.user_id,
+                        total_amount=order.total_amount,
+                        created_at=order.created_at,
+                        data=OrderArchiveService.snapshot(order),
+                    )
+                    for order in orders
+                ], ignore_conflicts=True)
+
+                Order.objects.filter(pk__in=[order.pk for order in orders]).delete()
+
+            archived += len(orders)
+
+        return archived
+
+    @staticmethod
+    def snapshot(order):
+        def fields(instance, exclude=()):
+            return {
+                field.attname: getattr(instance, field.attname)
+                for field in instance._meta.concrete_fields
+                if field.attname not in exclude
+            }
+
+        return {
+            'order': fields(order, exclude=('search_document',)),
+            'items': [fields(item) for item in order.items.all()],
+            'payments': [fields(payment) for payment in order.payments.all()],
+            'events': [fields(event) for event in order.events.all()],
+        }
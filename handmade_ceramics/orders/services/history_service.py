@@ -0,0 +1,119 @@
+# orders/services/history_service.py
+
+from django.db.models import (
+    Count, DecimalField, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce
+
+from orders.models import Order, OrderItem, INACTIVE_ITEM_STATUSES
+from product_management.models import Product, VariantImage
+
+
+class OrderHistoryService:
+    """
+    Customer-facing order history. Per-order figures are computed with
+    correlated subqueries on the order query itself, so a page of orders
+    costs one query however many items they hold.
+    """
+
+    @staticmethod
+    def _item_aggregate(expression, output_field, **filters):
+        items = (
+            OrderItem.objects
+            .filter(order=OuterRef('pk'), **filters)
+            .order_by()
+            .values('order')
+            .annotate(value=expression)
+            .values('value')
+        )
+        return Coalesce(
+            Subquery(items, output_field=output_field),
+            Value(0, output_field=output_field),
+        )
+
+    @staticmethod
+    def _thumbnail():
+        # first image of the first item's variant, else its product image
+        first_item = (
+            OrderItem.objects
+            .filter(order=OuterRef(OuterRef('pk')))
+            .order_by('created_at', 'pk')
+        )
+        variant_image = (
+            VariantImage.objects
+            .filter(variant_id=Subquery(first_item.values('variant_id')[:1]))
+            .order_by('order')
+            .values('image')[:1]
+        )
+        product_image = (
+            Product.all_objects
+            .filter(pk=Subquery(first_item.values('product_id')[:1]))
+            .values('main_image')[:1]
+        )
+        return Coalesce(
+            Subquery(variant_image),
+            Subquery(product_image),
+            output_field=VariantImage._meta.get_field('image'),
+        )
+
+    @staticmethod
+    def annotate_history(queryset):
+        money = DecimalField(max_digits=12, decimal_places=2)
+
+        return queryset.annotate(
+            item_count=OrderHistoryService._item_aggregate(
+                Count('pk'), IntegerField()
+            ),
+            refunded_total=OrderHistoryService._item_aggregate(
+                Sum('final_total'), money,
+                item_status__in=INACTIVE_ITEM_STATUSES,
+            ),
+            thumbnail=OrderHistoryService._thumbnail(),
+        )
+
+    @staticmethod
+    def orders_for(user, query='', status='all'):
+        orders = Order.objects.filter(user=user).order_by('-created_at')
+
+        if query:
+            orders = orders.filter(order_id__icontains=query)
+
+        if status != 'all':
+            orders = orders.filter(status=status)
+
+        return OrderHistoryService.annotate_history(orders)
+
+    @staticmethod
+    def order_with_items(user, order_id):
+        """
+        (order, items) for the detail page: the annotated order, then its
+        items with variant, product and ordered images loaded up front.
+        Each item gets an image_url. Raises Order.DoesNotExist.
+        """
+        order = OrderHistoryService.annotate_history(
+            Order.objects.select_related('coupon').filter(user=user)
+        ).get(order_id=order_id)
+
+        items = list(
+            order.items
+            .select_related('variant__product')
+            .prefetch_related(
+                Prefetch(
+                    'variant__images',
+                    queryset=VariantImage.objects.order_by('order'),
+                    to_attr='ordered_images'
+                )
+            )
+        )
+
+        for item in items:
+            variant = item.variant
+
+            if variant is not None and variant.ordered_images:
+                item.image_url = variant.ordered_images[0].image.url
+            elif variant is not None and variant.product.main_image:
+                item.image_url = variant.product.main_image.url
+            else:
+                item.image_url = None
+
+        return order, items
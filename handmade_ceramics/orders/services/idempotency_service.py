@@ -0,0 +1,77 @@
+# orders/services/idempotency_service.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from orders.models import IdempotencyKey
+
+
+class RequestInProgress(Exception):
+    """Another request with the same key has not finished yet."""
+
+
+class IdempotencyService:
+
+    @staticmethod
+    def run_once(scope, key, func):
+        """
+        Run `func` once per (scope, key) and return its JSON-serialisable
+        result; repeats get the stored result back without running it.
+
+        Call this outside any transaction so the key row is committed
+        before `func` starts and concurrent repeats see it straight away.
+        If `func` raises, the key is dropped so the client can retry.
+        """
+        while True:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(scope=scope, key=key)
+                break
+            except IntegrityError:
+                record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+
+            if record is None:
+                # the first attempt failed and dropped its key meanwhile
+                continue
+
+            if record.completed_at:
+                return record.result
+
+            if not IdempotencyService._take_over(record):
+                raise RequestInProgress(f"{scope}:{key}")
+            break
+
+        try:
+            result = func()
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            result=result,
+            completed_at=timezone.now(),
+        )
+        return result
+
+    @staticmethod
+    def _take_over(record):
+        """Claim a key left unfinished by a request that died midway."""
+        stale_before = timezone.now() - timedelta(
+            seconds=getattr(settings, 'IDEMPOTENCY_STALE_SECONDS', 120)
+        )
+        return IdempotencyKey.objects.filter(
+            pk=record.pk,
+            completed_at__isnull=True,
+            created_at__lt=stale_before,
+        ).update(created_at=timezone.now()) == 1
+
+    @staticmethod
+    def purge(older_than_days=None):
+        days = older_than_days or getattr(settings, 'IDEMPOTENCY_KEY_TTL_DAYS', 7)
+        deleted, _ = IdempotencyKey.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        return deleted
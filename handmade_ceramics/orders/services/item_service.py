@@ -1,5 +1,6 @@
 from django.db import transaction
 from orders.services.refund_service import RefundService
+from product_management.services import restore_stock
 
 
 class OrderItemService:
@@ -11,9 +12,7 @@ class OrderItemService:
         if order_item.item_status != 'RETURN_REQUESTED':
             return
 
-        if order_item.variant:
-            order_item.variant.stock += order_item.quantity
-            order_item.variant.save()
+        restore_stock([(order_item.variant_id, order_item.quantity)])
 
         RefundService.refund_to_wallet(
             user=order_item.order.user,
@@ -1,14 +1,33 @@
 # orders/services/order_service.py
 
 from django.db import transaction
+from django.db.models import Case, When, Value, F
+from django.utils import timezone
 from decimal import Decimal
 
 from .refund_service import RefundService
+from .reservation_service import ReservationService
+from orders.events import (
+    TRACKED_FIELDS, events_for_change, record_bulk_update, record_events, snapshot,
+)
+from orders.models import (
+    Order, OrderItem, INACTIVE_ITEM_STATUSES, ABANDONED_ORDER_REASON, OUT_OF_STOCK_REASON,
+)
+from product_management.services import InsufficientStock, restore_stock
 from wallet.models import Wallet, WalletTransaction
 
 
 class OrderService:
 
+    # order status the bulk admin action may set -> matching item status;
+    # cancellation and returns involve refunds and stay per-order
+    BULK_STATUS_TARGETS = {
+        'CONFIRMED': 'CONFIRMED',
+        'SHIPPED': 'SHIPPED',
+        'OUT_FOR_DELIVERY': 'SHIPPED',
+        'DELIVERED': 'DELIVERED',
+    }
+
     @staticmethod
     @transaction.atomic
     def cancel_item(item):
@@ -46,26 +65,26 @@ class OrderService:
 
         # ✅ Get only active items
         refundable_items = order.items.exclude(
-            item_status__in=["CANCELLED", "RETURNED"]
+            item_status__in=INACTIVE_ITEM_STATUSES
         )
 
-        if not refundable_items.exists():
+        totals = order.item_totals()
+
+        if not totals['active_count']:
             return
 
         # ✅ Calculate refund BEFORE any modification
-        refund_amount = sum(
-            (item.final_total for item in refundable_items),
-            Decimal("0.00")
-        ) if order.is_paid else Decimal("0.00")
+        refund_amount = (
+            totals['final_total'] if order.is_paid else Decimal("0.00")
+        )
+
+        # ✅ Cancel all items: one UPDATE, one grouped stock restore
+        lines = list(refundable_items.values_list('variant_id', 'quantity'))
 
-        # ✅ Cancel all items
-        for item in refundable_items:
-            if item.variant:
-                item.variant.stock += item.quantity
-                item.variant.save()
+        refundable_items.update(item_status="CANCELLED")
 
-            item.item_status = "CANCELLED"
-            item.save()
+        if ReservationService.settle_for_cancel(order):
+            restore_stock(lines)
 
         # ✅ Update order
         order.status = "CANCELLED"
@@ -83,10 +102,163 @@ class OrderService:
         order.save()
 
 
+    @staticmethod
+    @transaction.atomic
+    def cancel_unfulfillable(order):
+        """
+        Cancel an online order whose payment arrived after its stock hold
+        lapsed and the stock was sold meanwhile. Remaining holds are given
+        back, and if the order was paid the amount goes to the customer's
+        wallet.
+        """
+        ReservationService.release(order)
+
+        order.items.exclude(
+            item_status__in=INACTIVE_ITEM_STATUSES
+        ).update(item_status="CANCELLED")
+
+        order.status = "CANCELLED"
+        order.cancellation_reason = OUT_OF_STOCK_REASON
+
+        if order.is_paid and order.total_amount > 0:
+            RefundService.refund_to_wallet(
+                user=order.user,
+                amount=order.total_amount,
+                order=order,
+                source="ORDER_CANCEL_REFUND"
+            )
+            order.is_refunded = True
+        order.save()
+
+
     @staticmethod
     @transaction.atomic
     def process_item_return(item):
 
         if item.item_status != 'RETURN_REQUESTED':
             return
-        item.process_return()
\ No newline at end of file
+        item.process_return()
+
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_change_status(order_ids, new_status):
+        """
+        Move many orders to `new_status` at once. Transitions are checked
+        with can_change_status on the locked selection in memory; the
+        valid ones are applied with one UPDATE for the orders and one for
+        their active items, and their events are inserted in one go.
+        Returns (changed_order_ids, failures) where failures is a list of
+        (order_id, reason).
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+
+        if new_status not in OrderService.BULK_STATUS_TARGETS:
+            return [], [(order_id, "Unsupported status") for order_id in order_ids]
+
+        orders = {
+            order.order_id: order
+            for order in Order.objects
+            .select_for_update()
+            .filter(order_id__in=order_ids)
+            .only(
+                'pk', 'order_id', 'status', 'payment_method', 'created_at',
+                *TRACKED_FIELDS
+            )
+        }
+
+        changed, failures = [], []
+
+        for order_id in order_ids:
+            order = orders.get(order_id)
+
+            if order is None:
+                failures.append((order_id, "Order not found"))
+            elif not order.can_change_status(new_status):
+                failures.append((
+                    order_id,
+                    f"Cannot move from {order.get_status_display()}"
+                ))
+            elif not OrderService._settle_pending_holds(order, new_status):
+                failures.append((order_id, "Items are out of stock"))
+            else:
+                changed.append(order)
+
+        if not changed:
+            return [], failures
+
+        pks = [order.pk for order in changed]
+        updates = {'status': new_status, 'updated_at': timezone.now()}
+
+        if new_status == 'DELIVERED':
+            updates['is_paid'] = Case(
+                When(payment_method='COD', then=Value(True)),
+                default=F('is_paid'),
+            )
+
+        Order.objects.filter(pk__in=pks).update(**updates)
+
+        OrderItem.objects.filter(
+            order_id__in=pks
+        ).exclude(
+            item_status__in=INACTIVE_ITEM_STATUSES
+        ).update(item_status=OrderService.BULK_STATUS_TARGETS[new_status])
+
+        events = []
+        for order in changed:
+            before = snapshot(order)
+            after = dict(before, status=new_status)
+            if new_status == 'DELIVERED' and order.payment_method == 'COD':
+                after['is_paid'] = True
+            events += events_for_change(order, before, after)
+        record_events(events)
+
+        return [order.order_id for order in changed], failures
+
+
+    @staticmethod
+    def _settle_pending_holds(order, new_status):
+        # online orders confirmed by hand convert their holds, so the
+        # expiry sweep never hands their stock back
+        if order.status != 'PENDING':
+            return True
+        try:
+            with transaction.atomic():
+                ReservationService.settle_for_status(order, new_status)
+        except InsufficientStock:
+            return False
+        return True
+
+
+    @staticmethod
+    @transaction.atomic
+    def abandon_unpaid(order_pks):
+        """
+        Cancel online orders whose payment never completed: give back
+        their stock holds in one grouped restore and cancel them with one
+        UPDATE. Orders locked elsewhere (e.g. a payment being confirmed)
+        or no longer pending are skipped. Returns the abandoned pks.
+        """
+        orders = list(
+            Order.objects
+            .select_for_update(skip_locked=True)
+            .filter(pk__in=order_pks, status='PENDING', is_paid=False)
+            .only('pk', 'order_id', 'created_at', *TRACKED_FIELDS)
+        )
+        if not orders:
+            return []
+
+        pks = [order.pk for order in orders]
+
+        ReservationService.release_for_orders(pks, 'EXPIRED')
+
+        Order.objects.filter(pk__in=pks).update(
+            status='CANCELLED',
+            cancellation_reason=ABANDONED_ORDER_REASON,
+            updated_at=timezone.now(),
+        )
+        OrderItem.objects.filter(order_id__in=pks).update(item_status='CANCELLED')
+
+        record_bulk_update(orders, status='CANCELLED')
+
+        return pks
@@ -9,17 +9,16 @@ class PricingService:
     def quantify(amount):
         return Decimal(amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
+    @classmethod
     def calculate_order_totals(cls, order):
 
-        active_items = order.items.exclude(
-            item_status__in=['CANCELLED', 'RETURNED']
-        )
+        totals = order.item_totals()
 
-        subtotal = sum((item.item_total for item in active_items), Decimal("0.00"))
+        subtotal = totals['subtotal']
 
-        discount = sum((item.coupon_discount_amount for item in active_items), Decimal("0.00"))
+        discount = totals['discount']
 
-        final_items_total = sum((item.final_total for item in active_items), Decimal("0.00"))
+        final_items_total = totals['final_total']
 
         shipping = cls.calculate_shipping(subtotal)
 
@@ -1,8 +1,13 @@
 # orders/services/refund_service
 
+from collections import defaultdict
+from decimal import Decimal
+
 from django.db import transaction
-from django.db.models import F
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
 from wallet.models import Wallet, WalletTransaction
+from wallet.services import credit_wallet
 
 
 class RefundService:
@@ -14,20 +19,72 @@ class RefundService:
         if amount <= 0:
             return
 
-        wallet, _ = Wallet.objects.select_for_update().get_or_create(
+        wallet, _ = Wallet.objects.get_or_create(
             user=user,
             defaults={"balance": 0}
         )
 
-        wallet.balance = F("balance") + amount
-        wallet.save()
-        wallet.refresh_from_db()
-
-        WalletTransaction.objects.create(
-            wallet=wallet,
-            transaction_type=WalletTransaction.CREDIT,
-            source=source,
-            amount=amount,
-            description=f"Refund for order {order.order_id}",
-            order=order
-        )
\ No newline at end of file
+        credit_wallet(
+            wallet,
+            amount,
+            f"Refund for order {order.order_id}",
+            order=order,
+            source=source
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def refund_many(refunds):
+        """
+        Credit many (order, amount, source) refunds at once. Wallets are
+        locked in id order, each wallet's balance moves by its summed
+        refunds in a single UPDATE, and the transactions are written with
+        one bulk_create. Returns the number of transactions written.
+        """
+        refunds = [
+            (order, amount, source)
+            for order, amount, source in refunds
+            if amount > 0
+        ]
+        if not refunds:
+            return 0
+
+        user_ids = {order.user_id for order, _, _ in refunds}
+
+        Wallet.objects.bulk_create(
+            [Wallet(user_id=user_id, balance=0) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+        wallets = {
+            wallet.user_id: wallet
+            for wallet in Wallet.objects
+            .select_for_update()
+            .filter(user_id__in=user_ids)
+            .order_by('pk')
+        }
+
+        credits = defaultdict(Decimal)
+        for order, amount, _ in refunds:
+            credits[wallets[order.user_id].pk] += amount
+
+        Wallet.objects.filter(pk__in=credits).update(
+            balance=F('balance') + Case(
+                *[When(pk=pk, then=Value(total)) for pk, total in credits.items()],
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
+
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(
+                wallet=wallets[order.user_id],
+                transaction_type=WalletTransaction.CREDIT,
+                source=source,
+                amount=amount,
+                description=f"Refund for order {order.order_id}",
+                order=order
+            )
+            for order, amount, source in refunds
+        ])
+
+        return len(refunds)
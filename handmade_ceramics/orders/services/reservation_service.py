@@ -0,0 +1,195 @@
+# orders/services/reservation_service.py
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import StockReservation
+from product_management.services import decrement_stock, restore_stock
+
+
+def _quantities(lines):
+    quantities = Counter()
+    for variant_id, qty in lines:
+        if variant_id and qty:
+            quantities[variant_id] += qty
+    return quantities
+
+
+def reservation_ttl():
+    return timedelta(
+        minutes=getattr(settings, 'STOCK_RESERVATION_TTL_MINUTES', 15)
+    )
+
+
+class ReservationService:
+    """
+    Holds stock for online-payment orders between checkout and the
+    gateway callback. A hold decrements Variant.stock straight away, so
+    the normal stock column (and the listing/cart checks reading it)
+    already excludes units that are waiting on payment.
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def reserve(order, lines):
+        """
+        Take stock for (variant_id, qty) lines and record the holds.
+        Raises InsufficientStock without holding anything.
+        """
+        quantities = _quantities(lines)
+        decrement_stock(quantities.items())
+
+        expires_at = timezone.now() + reservation_ttl()
+
+        StockReservation.objects.bulk_create([
+            StockReservation(
+                order=order,
+                variant_id=variant_id,
+                quantity=qty,
+                expires_at=expires_at,
+            )
+            for variant_id, qty in quantities.items()
+        ])
+
+    @staticmethod
+    @transaction.atomic
+    def commit(order):
+        """
+        Convert an order's holds once it is paid. Lines whose hold already
+        expired (slow payment) have their stock taken again here, which
+        may raise InsufficientStock.
+        """
+        held = list(
+            order.stock_reservations
+            .select_for_update()
+            .filter(status='HELD')
+        )
+
+        missing = _quantities(
+            order.items
+            .exclude(variant__isnull=True)
+            .values_list('variant_id', 'quantity')
+        )
+        for reservation in held:
+            missing[reservation.variant_id] -= reservation.quantity
+
+        decrement_stock(
+            (variant_id, qty) for variant_id, qty in missing.items() if qty > 0
+        )
+
+        StockReservation.objects.filter(
+            pk__in=[r.pk for r in held]
+        ).update(status='CONVERTED', updated_at=timezone.now())
+
+    @staticmethod
+    @transaction.atomic
+    def release(order, status='RELEASED'):
+        """Give back an order's held stock, e.g. after a failed payment."""
+        held = list(
+            order.stock_reservations
+            .select_for_update()
+            .filter(status='HELD')
+        )
+        ReservationService._give_back(held, status)
+        return len(held)
+
+    @staticmethod
+    @transaction.atomic
+    def release_for_orders(order_ids, status='RELEASED'):
+        """release() for many orders with one grouped stock restore."""
+        held = list(
+            StockReservation.objects
+            .select_for_update()
+            .filter(order_id__in=order_ids, status='HELD')
+            .order_by('pk')
+        )
+        ReservationService._give_back(held, status)
+        return len(held)
+
+    @staticmethod
+    @transaction.atomic
+    def settle_for_status(order, new_status):
+        """
+        Settle an online order's holds as it leaves PENDING by hand:
+        confirming converts them (raising InsufficientStock if a lapsed
+        hold cannot be retaken), cancelling gives them back. Orders that
+        never held stock are left alone.
+        """
+        if not order.stock_reservations.exists():
+            return
+
+        if new_status == 'CONFIRMED':
+            ReservationService.commit(order)
+        elif new_status == 'CANCELLED':
+            ReservationService.release(order)
+
+    @staticmethod
+    @transaction.atomic
+    def settle_for_cancel(order, variant_ids=None):
+        """
+        Release holds for the cancelled lines (all lines by default) and
+        report whether their stock was actually taken, i.e. whether the
+        caller should restore it from the order items. Unpaid online
+        orders only ever held stock; every other order took it outright.
+        """
+        reservations = order.stock_reservations.select_for_update()
+        if variant_ids is not None:
+            reservations = reservations.filter(variant_id__in=variant_ids)
+        reservations = list(reservations)
+
+        if not reservations:
+            return True
+
+        ReservationService._give_back(
+            [r for r in reservations if r.status == 'HELD'],
+            'RELEASED'
+        )
+        return any(r.status == 'CONVERTED' for r in reservations)
+
+    @staticmethod
+    def expire_stale(batch_size=500):
+        """
+        Release holds past their expiry in batches. Rows locked by a
+        concurrent commit/release are skipped and picked up next run.
+        Returns the number of holds expired.
+        """
+        expired = 0
+
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    StockReservation.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(
+                        status='HELD',
+                        expires_at__lte=timezone.now(),
+                        # a confirmed order's hold is converted, never expired
+                        order__status='PENDING',
+                    )
+                    .order_by('expires_at')[:batch_size]
+                )
+                if not batch:
+                    break
+
+                ReservationService._give_back(batch, 'EXPIRED')
+
+            expired += len(batch)
+
+        return expired
+
+    @staticmethod
+    def _give_back(reservations, status):
+        if not reservations:
+            return
+
+        restore_stock(
+            (r.variant_id, r.quantity) for r in reservations
+        )
+
+        StockReservation.objects.filter(
+            pk__in=[r.pk for r in reservations]
+        ).update(status=status, updated_at=timezone.now())
@@ -1,8 +1,15 @@
 # orders/services/return_service.py
 
+from collections import defaultdict
 from django.db import transaction
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from decimal import Decimal
+from orders.events import TRACKED_FIELDS, record_bulk_update
+from orders.models import Order, OrderItem
 from orders.services.refund_service import RefundService
+from product_management.services import restore_stock
 
 
 class ReturnService:
@@ -48,14 +55,16 @@ class ReturnService:
 
         items = order.items.filter(item_status='RETURN_PROCESSING')
 
-        if not items.exists():
+        totals = items.aggregate(
+            refund=Coalesce(Sum('final_total'), Value(Decimal("0.00"))),
+            count=Count('pk'),
+        )
+
+        if not totals['count']:
             return False
 
         # ✅ SINGLE SOURCE OF TRUTH FOR REFUND
-        total_refund = sum(
-            (item.final_total for item in items),
-            Decimal("0.00")
-        )
+        total_refund = totals['refund']
 
         # ✅ Refund ONLY ONCE
         if total_refund > 0:
@@ -66,8 +75,10 @@ class ReturnService:
                 source='RETURN_REFUND'
             )
 
-        # ✅ Mark returned
+        # ✅ Mark returned and put the stock back in one grouped UPDATE
+        lines = list(items.values_list('variant_id', 'quantity'))
         items.update(item_status='RETURNED')
+        restore_stock(lines)
 
         order.status = 'RETURNED'
         order.is_refunded = True
@@ -77,4 +88,112 @@ class ReturnService:
 
         order.save()
 
-        return True
\ No newline at end of file
+        return True
+
+
+    @staticmethod
+    def _lock_orders(order_ids):
+        return {
+            order.order_id: order
+            for order in Order.objects
+            .select_for_update()
+            .filter(order_id__in=order_ids)
+            .only('pk', 'order_id', 'user', 'created_at', *TRACKED_FIELDS)
+        }
+
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_approve_returns(order_ids):
+        """
+        approve_order_return for many orders: one UPDATE for the orders,
+        one for their requested items. Returns (approved_order_ids,
+        failures) where failures is a list of (order_id, reason).
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        orders = ReturnService._lock_orders(order_ids)
+
+        approved, failures = [], []
+
+        for order_id in order_ids:
+            order = orders.get(order_id)
+
+            if order is None:
+                failures.append((order_id, "Order not found"))
+            elif order.status not in ["RETURN_REQUESTED", "PARTIAL_RETURN_REQUESTED"]:
+                failures.append((order_id, "No return requested"))
+            else:
+                approved.append(order)
+
+        if not approved:
+            return [], failures
+
+        pks = [order.pk for order in approved]
+
+        Order.objects.filter(pk__in=pks).update(
+            status="RETURN_PROCESSING", updated_at=timezone.now()
+        )
+        OrderItem.objects.filter(
+            order_id__in=pks, item_status="RETURN_REQUESTED"
+        ).update(item_status="RETURN_PROCESSING")
+
+        record_bulk_update(approved, status="RETURN_PROCESSING")
+
+        return [order.order_id for order in approved], failures
+
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_complete_returns(order_ids):
+        """
+        complete_order_return for many orders. Items are marked returned
+        with one UPDATE, stock comes back in one grouped restore and all
+        refunds go through RefundService.refund_many, so the statement
+        count does not grow with the number of orders. Returns
+        (completed_order_ids, failures).
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        orders = ReturnService._lock_orders(order_ids)
+
+        items = OrderItem.objects.filter(
+            order_id__in=[order.pk for order in orders.values()],
+            item_status='RETURN_PROCESSING'
+        )
+
+        refunds = defaultdict(Decimal)
+        lines = []
+
+        for order_pk, variant_id, quantity, final_total in items.values_list(
+            'order_id', 'variant_id', 'quantity', 'final_total'
+        ):
+            refunds[order_pk] += final_total
+            lines.append((variant_id, quantity))
+
+        completed, failures = [], []
+
+        for order_id in order_ids:
+            order = orders.get(order_id)
+
+            if order is None:
+                failures.append((order_id, "Order not found"))
+            elif order.pk not in refunds:
+                failures.append((order_id, "No items awaiting return"))
+            else:
+                completed.append(order)
+
+        if not completed:
+            return [], failures
+
+        items.update(item_status='RETURNED')
+        restore_stock(lines)
+
+        RefundService.refund_many(
+            (order, refunds[order.pk], 'RETURN_REFUND') for order in completed
+        )
+
+        Order.objects.filter(pk__in=[order.pk for order in completed]).update(
+            status='RETURNED', is_refunded=True, updated_at=timezone.now()
+        )
+        record_bulk_update(completed, status='RETURNED', is_refunded=True)
+
+        return [order.order_id for order in completed], failures
@@ -4,34 +4,26 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import FileResponse, Http404
 from django.core.paginator import Paginator
-from django.template.loader import render_to_string
 from django.db.models import F
 from django.views.decorators.http import require_POST
-import weasyprint
 from decimal import Decimal
 from .models import Order, OrderItem
-from profiles.models import Profile
+from .invoices import open_invoice
 from coupons.models import CouponUsage
 from wallet.models import Wallet, WalletTransaction
 from orders.services.order_service import OrderService
-from django.db.models import Sum
+from orders.services.history_service import OrderHistoryService
 
 @login_required
 def order_list(request):
-    profile, _ = Profile.objects.get_or_create(user=request.user)
+    profile = request.shopper.profile
 
     query = request.GET.get('q', '')
     status_filter = request.GET.get('status', 'all')
 
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-
-    if query:
-        orders = orders.filter(order_id__icontains=query)
-
-    if status_filter != 'all':
-        orders = orders.filter(status=status_filter)
+    orders = OrderHistoryService.orders_for(request.user, query, status_filter)
 
     paginator = Paginator(orders, 10)
     page_number = request.GET.get('page')
@@ -51,21 +43,18 @@ def order_list(request):
 
 @login_required
 def order_detail(request, order_id):
-    profile, _ = Profile.objects.get_or_create(user=request.user)
+    profile = request.shopper.profile
 
-    order = get_object_or_404(Order, order_id=order_id, user=request.user)
-    items = order.items.all()
-    refunded_amount = order.items.filter(
-        item_status__in=['CANCELLED', 'RETURNED']
-    ).aggregate(
-        total=Sum('final_total')
-    )['total'] or 0
+    try:
+        order, items = OrderHistoryService.order_with_items(request.user, order_id)
+    except Order.DoesNotExist:
+        raise Http404("No Order matches the given query.")
 
     return render(request, "orders/order_detail.html", {
         "order": order,
         "items": items,
         "profile": profile,
-        "refunded_amount": refunded_amount,
+        "refunded_amount": order.refunded_total,
     })
 
 @login_required
@@ -180,28 +169,11 @@ def request_item_return(request, item_id):
 
 def download_invoice(request, order_id):
     order = get_object_or_404(Order, order_id=order_id, user=request.user)
-    items = order.items.all()
-
-    for item in items:
-        item.item_total = item.unit_price * item.quantity
-
-    subtotal = getattr(order, 'subtotal', None) or sum(item.item_total for item in items)
-    discount = getattr(order, 'discount_amount', 0) or 0
-    tax      = getattr(order, 'tax_amount',      0) or 0
-    shipping = getattr(order, 'shipping_charge', 0) or 0
-    total    = getattr(order, 'total_amount', subtotal - discount + tax + shipping)
-
-    html = render_to_string("orders/invoice.html", {
-        "order":    order,
-        "items":    items,
-        "subtotal": subtotal,
-        "discount": discount,
-        "tax":      tax,
-        "shipping": shipping,
-        "total":    total,
-    })
 
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="invoice_{order.order_id}.pdf"'
-    weasyprint.HTML(string=html).write_pdf(response)
-    return response
\ No newline at end of file
+    # usually already rendered in the background after confirmation
+    return FileResponse(
+        open_invoice(order),
+        as_attachment=True,
+        filename=f"invoice_{order.order_id}.pdf",
+        content_type="application/pdf",
+    )
@@ -1,7 +1,7 @@
 # payments/admin.py
 
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, WebhookEvent
 
 
 @admin.register(Payment)
@@ -15,3 +15,11 @@ class PaymentAdmin(admin.ModelAdmin):
     )
     list_filter = ('gateway', 'status')
     search_fields = ('order__order_id', 'razorpay_order_id')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'received_at', 'processed_at')
+    list_filter = ('event_type',)
+    search_fields = ('event_id',)
+    readonly_fields = ('gateway', 'event_id', 'event_type', 'payload', 'received_at', 'processed_at', 'error')
@@ -0,0 +1,180 @@
+# payments/fake_gateway.py
+
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from razorpay.errors import ServerError, SignatureVerificationError
+
+logger = logging.getLogger(__name__)
+
+def sign_payment(razorpay_order_id, razorpay_payment_id, secret=None):
+    """The signature Razorpay's checkout would post back for a payment."""
+    secret = secret or settings.RAZORPAY_KEY_SECRET
+    message = f"{razorpay_order_id}|{razorpay_payment_id}"
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def sign_webhook(body, secret=None):
+    """X-Razorpay-Signature for a webhook body (str)."""
+    secret = secret or settings.RAZORPAY_WEBHOOK_SECRET
+    return hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+
+class _FakeOrders:
+
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, data, **kwargs):
+        self.client.call()
+        order = {
+            "id": f"order_fake{uuid.uuid4().hex[:14]}",
+            "entity": "order",
+            "amount": data["amount"],
+            "currency": data.get("currency", "INR"),
+            "receipt": data.get("receipt"),
+            "status": "created",
+            "created_at": int(time.time()),
+        }
+        with self.client.lock:
+            self.client.orders[order["id"]] = order
+        return order
+
+    def payments(self, order_id, data=None, **kwargs):
+        self.client.call()
+        with self.client.lock:
+            items = [
+                payment for payment in self.client.payments.values()
+                if payment["order_id"] == order_id
+            ]
+        return {"entity": "collection", "count": len(items), "items": items}
+
+
+class _FakeUtility:
+
+    def __init__(self, client):
+        self.client = client
+
+    def verify_payment_signature(self, parameters):
+        expected = sign_payment(
+            parameters["razorpay_order_id"],
+            parameters["razorpay_payment_id"],
+            self.client.secret,
+        )
+        if not hmac.compare_digest(expected, parameters["razorpay_signature"]):
+            raise SignatureVerificationError("Razorpay Signature Verification Failed")
+        return True
+
+    def verify_webhook_signature(self, body, signature, secret):
+        if not hmac.compare_digest(sign_webhook(body, secret), signature):
+            raise SignatureVerificationError("Razorpay Signature Verification Failed")
+        return True
+
+
+class FakeRazorpayClient:
+    """
+    Offline, in-process stand-in for razorpay.Client, for load tests
+    (PAYMENT_GATEWAY_CLIENT = 'payments.fake_gateway.FakeRazorpayClient').
+
+    Every API call waits RAZORPAY_FAKE_LATENCY_MS (give or take
+    RAZORPAY_FAKE_LATENCY_JITTER_MS) and fails with a ServerError at
+    RAZORPAY_FAKE_ERROR_RATE. pay() plays the customer on the hosted
+    checkout: it records a payment, declined at RAZORPAY_FAKE_DECLINE_RATE,
+    and returns what the checkout would post back, signed with real HMACs
+    so verify_payment accepts it unchanged. Captured payments are also
+    sent, signed, through the webhook handler before pay() returns, as
+    the webhook is what confirms them. Orders and payments live in this
+    client, i.e. in one process.
+    """
+
+    def __init__(self, key_id, secret):
+        self.key_id = key_id
+        self.secret = secret
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.payments = {}
+        self.order = _FakeOrders(self)
+        self.utility = _FakeUtility(self)
+
+    def wait(self):
+        latency_ms = getattr(settings, 'RAZORPAY_FAKE_LATENCY_MS', 0)
+        jitter_ms = getattr(settings, 'RAZORPAY_FAKE_LATENCY_JITTER_MS', 0)
+        if jitter_ms:
+            latency_ms += random.uniform(-jitter_ms, jitter_ms)
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000)
+
+    def call(self):
+        self.wait()
+        if random.random() < getattr(settings, 'RAZORPAY_FAKE_ERROR_RATE', 0):
+            raise ServerError("Simulated gateway error")
+
+    def pay(self, razorpay_order_id):
+        """
+        Pay a gateway order created on this client. Returns the checkout's
+        success response, or None if the payment was declined (or the
+        order is unknown).
+        """
+        self.wait()
+
+        with self.lock:
+            order = self.orders.get(razorpay_order_id)
+        if order is None:
+            return None
+
+        declined = random.random() < getattr(settings, 'RAZORPAY_FAKE_DECLINE_RATE', 0)
+        payment = {
+            "id": f"pay_fake{uuid.uuid4().hex[:14]}",
+            "entity": "payment",
+            "order_id": razorpay_order_id,
+            "amount": order["amount"],
+            "currency": order["currency"],
+            "status": "failed" if declined else "captured",
+            "created_at": int(time.time()),
+        }
+
+        with self.lock:
+            self.payments[payment["id"]] = payment
+            if not declined:
+                order["status"] = "paid"
+
+        if declined:
+            return None
+
+        self.deliver_webhook(payment)
+
+        return {
+            "razorpay_payment_id": payment["id"],
+            "razorpay_order_id": razorpay_order_id,
+            "razorpay_signature": sign_payment(
+                razorpay_order_id, payment["id"], self.secret
+            ),
+        }
+
+    def deliver_webhook(self, payment):
+        """
+        Hand a payment.captured event for `payment` to receive_webhook,
+        as the gateway would. Failures are logged and left to the
+        reconciler, like a webhook the gateway gave up on.
+        """
+        from .services import receive_webhook
+
+        body = json.dumps({
+            "entity": "event",
+            "event": "payment.captured",
+            "payload": {"payment": {"entity": payment}},
+            "created_at": int(time.time()),
+        })
+        try:
+            receive_webhook(
+                body.encode(), sign_webhook(body), f"evt_fake{uuid.uuid4().hex[:14]}"
+            )
+        except Exception:
+            logger.exception("Fake webhook for %s failed", payment["id"])
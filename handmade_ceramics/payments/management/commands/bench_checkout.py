@@ -0,0 +1,177 @@
+# payments/management/commands/bench_checkout.py
+
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import Resolver404, resolve, reverse
+
+from cart.models import Cart, CartItem
+from category_management.models import Category
+from payments.fake_gateway import FakeRazorpayClient
+from payments.models import Payment
+from payments.services import get_razorpay_client
+from product_management.models import Product, Variant
+from profiles.models import Address
+
+STEPS = ('place_order', 'start', 'pay', 'verify')
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the online checkout -> pay -> confirm path end to end against "
+        "the fake gateway with concurrent customers and report throughput "
+        "and per-step latency. Requires PAYMENT_GATEWAY_CLIENT = "
+        "'payments.fake_gateway.FakeRazorpayClient'. Creates throwaway "
+        "customers and a product and removes them afterwards. Run against "
+        "PostgreSQL, not sqlite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        if not isinstance(get_razorpay_client(), FakeRazorpayClient):
+            raise CommandError("The fake gateway is not configured.")
+
+        # lets the test client through ALLOWED_HOSTS and keeps order
+        # emails in memory
+        setup_test_environment()
+
+        workers = options['workers']
+        tag = uuid.uuid4().hex[:8]
+
+        category = Category.objects.create(name=f"bench-{tag}")
+        product = Product.all_objects.create(
+            name=f"bench-{tag}", category=category, price=500
+        )
+        variant = Variant.objects.create(
+            product=product, color='bench', stock=10 ** 9
+        )
+        # saving the product unlisted it, as it had no variant yet
+        Product.all_objects.filter(pk=product.pk).update(is_listed=True)
+        users = [
+            get_user_model().objects.create_user(
+                username=f"bench-{tag}-{slot}",
+                email=f"bench-{tag}-{slot}@example.com",
+                password=uuid.uuid4().hex,
+            )
+            for slot in range(workers)
+        ]
+
+        try:
+            timings, outcomes, elapsed = self.run(users, variant, options['seconds'])
+        finally:
+            for user in users:
+                user.delete()
+            product.delete()
+            category.delete()
+
+        paid = outcomes.count('paid')
+        self.stdout.write(
+            f"{len(outcomes)} checkouts in {elapsed:.1f}s with {workers} "
+            f"workers: {paid} paid ({paid / elapsed:.1f}/s), "
+            f"{len(outcomes) - paid} failed or declined"
+        )
+        self.stdout.write(f"{'step':>12} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for step in STEPS:
+            samples = sorted(timings[step])
+            if not samples:
+                continue
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            self.stdout.write(
+                f"{step:>12} {statistics.median(samples):>8.0f} "
+                f"{p95:>8.0f} {samples[-1]:>8.0f}"
+            )
+
+    def run(self, users, variant, seconds):
+        timings = {step: [] for step in STEPS}
+        outcomes = []
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def work(user):
+            try:
+                client = Client()
+                client.force_login(user)
+                address = Address.objects.create(
+                    user=user, first_name='Bench', last_name='User',
+                    country='India', street_address='1 Bench Road',
+                    city='Kochi', state='Kerala', pin_code='682001',
+                    phone='9876543210',
+                )
+                cart, _ = Cart.objects.get_or_create(user=user)
+
+                while time.monotonic() < deadline:
+                    # the cart is only emptied once a payment is confirmed
+                    CartItem.objects.get_or_create(
+                        cart=cart, variant=variant, defaults={'quantity': 1}
+                    )
+                    steps = {}
+                    outcome = self.checkout(client, address, steps)
+                    with lock:
+                        outcomes.append(outcome)
+                        for step, ms in steps.items():
+                            timings[step].append(ms)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(user,)) for user in users]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return timings, outcomes, time.monotonic() - started
+
+    def checkout(self, client, address, steps):
+        def timed(step, func):
+            started = time.monotonic()
+            response = func()
+            steps[step] = (time.monotonic() - started) * 1000
+            return response
+
+        response = timed('place_order', lambda: client.post(
+            reverse('checkout:place_order'),
+            {'address_id': address.pk, 'payment_method': 'RAZORPAY',
+             'idempotency_key': uuid.uuid4().hex},
+        ))
+        try:
+            match = resolve(response.get('Location', ''))
+        except Resolver404:
+            return 'failed'
+        if match.view_name != 'payments:start':
+            # sent back to the cart or checkout
+            return 'failed'
+
+        response = timed('start', lambda: client.get(response['Location']))
+        order_id = match.kwargs['order_id']
+        payment = (
+            Payment.objects
+            .filter(order__order_id=order_id, status='PENDING')
+            .order_by('-pk')
+            .first()
+        )
+        if response.status_code != 200 or payment is None:
+            return 'failed'
+
+        response = timed('pay', lambda: client.post(
+            reverse('payments:fake_pay'),
+            {'razorpay_order_id': payment.razorpay_order_id},
+        ))
+        if response.status_code != 200:
+            return 'declined'
+
+        response = timed('verify', lambda: client.post(
+            reverse('payments:verify'), response.json()
+        ))
+        payment.refresh_from_db()
+        return 'paid' if payment.status == 'SUCCESS' else 'failed'
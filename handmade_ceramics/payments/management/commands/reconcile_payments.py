@@ -0,0 +1,52 @@
+# payments/management/commands/reconcile_payments.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.services.archive_service import OrderArchiveService
+from payments.reconciler import abandon_stale_orders, reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle online payments still pending after "
+        "PAYMENT_RECONCILE_AFTER_MINUTES against the gateway, cancel the "
+        "orders that were never paid (returning their held stock) and "
+        "archive abandoned orders older than ABANDONED_ORDER_ARCHIVE_DAYS. "
+        "Run from cron every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None,
+                            help="Minutes a payment may stay pending.")
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--archive-days', type=int, default=None,
+                            help="0 skips archiving.")
+
+    def handle(self, *args, **options):
+        older_than = (
+            timedelta(minutes=options['older_than'])
+            if options['older_than'] is not None else None
+        )
+        chunk_size = options['chunk_size']
+
+        confirmed, failed = reconcile_pending_payments(older_than, chunk_size)
+        abandoned = abandon_stale_orders(older_than, chunk_size)
+
+        self.stdout.write(
+            f"Confirmed {confirmed} and failed {failed} pending payments; "
+            f"abandoned {abandoned} more orders."
+        )
+
+        archive_days = options['archive_days']
+        if archive_days is None:
+            archive_days = getattr(settings, 'ABANDONED_ORDER_ARCHIVE_DAYS', 30)
+
+        if archive_days:
+            archived = OrderArchiveService.archive_abandoned(
+                archive_days,
+                chunk_size or getattr(settings, 'PAYMENT_RECONCILE_CHUNK_SIZE', 200),
+            )
+            self.stdout.write(f"Archived {archived} abandoned orders.")
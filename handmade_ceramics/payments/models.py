@@ -71,6 +71,30 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['razorpay_order_id'], name='payments_rzp_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.order.order_id} | {self.gateway} | {self.status}"
+
+
+class WebhookEvent(models.Model):
+    """
+    Raw gateway webhook, stored before it is acted on. event_id is the
+    gateway's own id, so redelivered events are recognised and skipped.
+    """
+    gateway = models.CharField(max_length=20, choices=PAYMENT_GATEWAY_CHOICES, default='RAZORPAY')
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-received_at']
+
+    def __str__(self):
+        return f"{self.event_id} | {self.event_type}"
@@ -0,0 +1,178 @@
+# payments/reconciler.py
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from orders.models import Order
+from orders.services.order_service import OrderService
+from .models import Payment
+from .services import confirm_payment, get_razorpay_client
+
+logger = logging.getLogger(__name__)
+
+# gateway payment states that mean the money was taken
+CAPTURED_STATES = ('captured',)
+# ... and that may still end up captured
+IN_FLIGHT_STATES = ('created', 'authorized')
+
+
+def reconcile_after():
+    return timedelta(
+        minutes=getattr(settings, 'PAYMENT_RECONCILE_AFTER_MINUTES', 30)
+    )
+
+
+def _chunk_size(chunk_size):
+    return chunk_size or getattr(settings, 'PAYMENT_RECONCILE_CHUNK_SIZE', 200)
+
+
+def _keyset_chunks(queryset, chunk_size):
+    """Yield lists of rows in pk order, one query per chunk."""
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def gateway_payment_state(razorpay_order_id):
+    """
+    What the gateway holds for a gateway order: ('captured', payment id),
+    ('in_flight', None) while an attempt may still be captured, or
+    ('unpaid', None). One call per order keeps the cost proportional to
+    the pending payments, not to everything the gateway processed since
+    the oldest of them.
+    """
+    response = get_razorpay_client().order.payments(razorpay_order_id)
+    items = response.get('items', [])
+
+    for item in items:
+        if item.get('status') in CAPTURED_STATES:
+            return 'captured', item['id']
+
+    if any(item.get('status') in IN_FLIGHT_STATES for item in items):
+        return 'in_flight', None
+
+    return 'unpaid', None
+
+
+def reconcile_pending_payments(older_than=None, chunk_size=None):
+    """
+    Settle Razorpay payments left PENDING for longer than `older_than`
+    (PAYMENT_RECONCILE_AFTER_MINUTES by default), a keyset chunk at a
+    time. Each gateway order is looked up once: captured payments are
+    confirmed as if their webhook had arrived, the rest of the chunk is
+    failed in one UPDATE and their orders abandoned. Payments still
+    created or authorized at the gateway, and orders the gateway could
+    not be asked about, stay pending.
+    Returns (confirmed, failed).
+    """
+    cutoff = timezone.now() - (older_than or reconcile_after())
+
+    pending = Payment.objects.filter(
+        gateway='RAZORPAY', status='PENDING', created_at__lte=cutoff,
+    ).only('pk', 'order_id', 'razorpay_order_id')
+
+    confirmed = failed = 0
+
+    for chunk in _keyset_chunks(pending, _chunk_size(chunk_size)):
+        unpaid = []
+        for payment in chunk:
+            try:
+                state, gateway_payment_id = gateway_payment_state(
+                    payment.razorpay_order_id
+                )
+            except Exception:
+                # unknown state: leave it pending for the next run
+                logger.exception(
+                    "Could not fetch payments of %s", payment.razorpay_order_id
+                )
+                continue
+
+            if state == 'in_flight':
+                # may still be captured: check again on the next run
+                continue
+
+            if state == 'captured':
+                try:
+                    confirm_payment(payment.razorpay_order_id, gateway_payment_id)
+                    confirmed += 1
+                except Exception:
+                    logger.exception(
+                        "Could not confirm captured payment %s", gateway_payment_id
+                    )
+            else:
+                unpaid.append(payment)
+
+        if unpaid:
+            failed += fail_payments(unpaid)
+
+    return confirmed, failed
+
+
+@transaction.atomic
+def fail_payments(payments):
+    """
+    Mark `payments` FAILED unless something settled them meanwhile, and
+    abandon their orders once no other attempt is pending. Returns the
+    number failed.
+    """
+    locked = list(
+        Payment.objects
+        .select_for_update(skip_locked=True)
+        .filter(pk__in=[payment.pk for payment in payments], status='PENDING')
+        .order_by('pk')
+        .values_list('pk', 'order_id')
+    )
+    if not locked:
+        return 0
+
+    Payment.objects.filter(pk__in=[pk for pk, _ in locked]).update(
+        status='FAILED', updated_at=timezone.now()
+    )
+
+    # a retried checkout may still have a newer attempt in flight
+    order_ids = (
+        Order.objects
+        .filter(pk__in={order_id for _, order_id in locked})
+        .exclude(Exists(
+            Payment.objects.filter(order=OuterRef('pk'), status='PENDING')
+        ))
+        .values_list('pk', flat=True)
+    )
+    OrderService.abandon_unpaid(list(order_ids))
+
+    return len(locked)
+
+
+def abandon_stale_orders(older_than=None, chunk_size=None):
+    """
+    Abandon pending online orders older than `older_than` that have no
+    payment left in flight, e.g. the customer closed the gateway page
+    and every attempt was already marked failed. Returns the count.
+    """
+    cutoff = timezone.now() - (older_than or reconcile_after())
+
+    stale = (
+        Order.objects
+        .filter(
+            status='PENDING', is_paid=False,
+            payment_method='RAZORPAY', created_at__lte=cutoff,
+        )
+        .exclude(Exists(
+            Payment.objects.filter(order=OuterRef('pk'), status='PENDING')
+        ))
+        .only('pk')
+    )
+
+    abandoned = 0
+    for chunk in _keyset_chunks(stale, _chunk_size(chunk_size)):
+        abandoned += len(OrderService.abandon_unpaid([order.pk for order in chunk]))
+    return abandoned
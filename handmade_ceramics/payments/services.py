@@ -1,10 +1,338 @@
 # payments/services.py
 
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
 import razorpay
+import requests
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cart.models import CartItem
+from orders.models import ArchivedOrder, ABANDONED_ORDER_REASON
+from orders.services.order_service import OrderService
+from orders.services.refund_service import RefundService
+from orders.services.reservation_service import ReservationService
+from product_management.services import InsufficientStock
+from wallet.models import Wallet
+from wallet.services import credit_wallet
+from .models import Payment, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+class GatewaySession(requests.Session):
+    """
+    requests session for gateway calls: every request gets the default
+    (connect, read) timeout unless it passes its own, and is logged with
+    its latency; calls slower than RAZORPAY_SLOW_CALL_MS log a warning.
+    """
+
+    def __init__(self, timeout, slow_ms):
+        super().__init__()
+        self.timeout = timeout
+        self.slow_ms = slow_ms
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        path = urlsplit(url).path
+        started = time.monotonic()
+
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException as exc:
+            logger.warning(
+                "razorpay %s %s failed after %.0f ms: %s",
+                method.upper(), path, (time.monotonic() - started) * 1000, exc
+            )
+            raise
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        logger.log(
+            logging.WARNING if elapsed_ms >= self.slow_ms else logging.INFO,
+            "razorpay %s %s -> %s in %.0f ms",
+            method.upper(), path, response.status_code, elapsed_ms
+        )
+        return response
+
+
+def build_session():
+    retries = Retry(
+        total=getattr(settings, 'RAZORPAY_MAX_RETRIES', 2),
+        # connection failures never reached the gateway and are always
+        # safe to retry; read errors and 5xx are retried for GETs only, so
+        # a POST that may have created an order is never sent twice
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        status_forcelist=(502, 503, 504),
+        backoff_factor=getattr(settings, 'RAZORPAY_RETRY_BACKOFF', 0.3),
+        raise_on_status=False,
+    )
+    pool_size = getattr(settings, 'RAZORPAY_POOL_SIZE', 10)
+
+    session = GatewaySession(
+        timeout=(
+            getattr(settings, 'RAZORPAY_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'RAZORPAY_READ_TIMEOUT', 10),
+        ),
+        slow_ms=getattr(settings, 'RAZORPAY_SLOW_CALL_MS', 2000),
+    )
+    session.mount('https://', HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=retries,
+    ))
+    return session
+
+
+def build_razorpay_client(key_id, secret):
+    return razorpay.Client(session=build_session(), auth=(key_id, secret))
+
+
+def _build_client():
+    # PAYMENT_GATEWAY_CLIENT names a factory(key_id, secret) returning an
+    # object shaped like razorpay.Client: order.create(), order.payments() and
+    # utility.verify_payment_signature() / verify_webhook_signature()
+    factory = import_string(getattr(
+        settings, 'PAYMENT_GATEWAY_CLIENT',
+        'payments.services.build_razorpay_client'
+    ))
+    return factory(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
 
 
 def get_razorpay_client():
-    return razorpay.Client(
-        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+    """
+    The process-wide Razorpay client. Its session keeps TLS connections
+    to the gateway open between requests; it is rebuilt after a fork so
+    worker processes never share sockets.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+    return _client
+
+
+# webhook events that mean the money has been taken
+PAYMENT_CAPTURED_EVENTS = ('payment.captured', 'order.paid')
+
+
+def confirm_payment(razorpay_order_id, razorpay_payment_id, razorpay_signature=None):
+    """
+    Mark a gateway order's payment and its order paid: records coupon
+    usage, converts the stock hold and clears the cart. Called by the
+    webhook and by the reconciler for payments whose webhook never came;
+    the Payment row is locked and only a PENDING or FAILED payment is
+    processed, so the work runs once per payment. If the order's stock
+    hold lapsed and cannot be retaken, the order is cancelled and the
+    amount refunded to the wallet instead.
+
+    A capture on a payment already marked FAILED (the gateway settled it
+    after the reconciler gave up) reopens the abandoned order, or
+    refunds the amount to the wallet if the order cannot take it any
+    more. Returns the Payment (None if unknown).
+    """
+    with transaction.atomic():
+        payment = (
+            Payment.objects
+            .select_for_update()
+            .select_related('order')
+            .filter(razorpay_order_id=razorpay_order_id)
+            .first()
+        )
+
+        if payment is None:
+            _refund_archived_capture(razorpay_order_id, razorpay_payment_id)
+            return None
+
+        if payment.status not in ('PENDING', 'FAILED'):
+            return payment
+
+        late = payment.status == 'FAILED'
+
+        payment.razorpay_payment_id = razorpay_payment_id
+        if razorpay_signature:
+            payment.razorpay_signature = razorpay_signature
+        payment.status = "SUCCESS"
+        payment.save()
+
+        order = payment.order
+
+        if late:
+            logger.warning(
+                "Payment %s for order %s captured after it was marked failed",
+                razorpay_payment_id, order.order_id
+            )
+            if not _reopen_abandoned(order):
+                # paid by another attempt or cancelled for good meanwhile
+                RefundService.refund_to_wallet(
+                    user=order.user,
+                    amount=payment.amount,
+                    order=order,
+                    source="ORDER_CANCEL_REFUND"
+                )
+                return payment
+
+        order.is_paid = True
+        order.payment_method = "RAZORPAY"
+
+        try:
+            # converts the hold; retakes the stock if it lapsed
+            with transaction.atomic():
+                ReservationService.commit(order)
+        except InsufficientStock:
+            # the money is taken but the stock is gone: cancel and refund
+            # to the wallet, and still answer the gateway with success
+            logger.warning(
+                "Order %s paid after its stock was sold; cancelled and refunded",
+                order.order_id
+            )
+            OrderService.cancel_unfulfillable(order)
+            return payment
+
+        order.status = "CONFIRMED"
+        order.save()
+
+        if order.coupon:
+            from coupons.models import CouponUsage
+            CouponUsage.objects.get_or_create(user=order.user, coupon=order.coupon, order=order)
+
+        if not late:
+            # a late capture leaves whatever the customer has added since
+            CartItem.objects.filter(cart__user=order.user).delete()
+
+    return payment
+
+
+def _reopen_abandoned(order):
+    """
+    Restore the items of an order abandoned for non-payment so it can be
+    confirmed; the caller saves the order. False if it was not abandoned
+    that way.
+    """
+    if (order.is_paid or order.status != 'CANCELLED'
+            or order.cancellation_reason != ABANDONED_ORDER_REASON):
+        return False
+
+    order.items.filter(item_status='CANCELLED').update(item_status='PENDING')
+    order.cancellation_reason = None
+    return True
+
+
+def _refund_archived_capture(razorpay_order_id, razorpay_payment_id):
+    """
+    Credit a capture for an order already archived (its Payment row went
+    with it) to the customer's wallet, once per gateway payment.
+    """
+    archived = (
+        ArchivedOrder.objects
+        .select_for_update()
+        .filter(data__payments__contains=[{'razorpay_order_id': razorpay_order_id}])
+        .first()
+    )
+    if archived is None:
+        logger.error(
+            "Captured payment %s matches no order (gateway order %s)",
+            razorpay_payment_id, razorpay_order_id
+        )
+        return
+
+    refunded = archived.data.setdefault('late_captures', [])
+    if razorpay_payment_id in refunded:
+        return
+
+    amount = next(
+        Decimal(payment['amount'])
+        for payment in archived.data['payments']
+        if payment['razorpay_order_id'] == razorpay_order_id
+    )
+
+    logger.warning(
+        "Payment %s captured for archived order %s; refunding to the wallet",
+        razorpay_payment_id, archived.order_id
     )
+    if archived.user_id and amount > 0:
+        wallet, _ = Wallet.objects.get_or_create(
+            user_id=archived.user_id, defaults={"balance": 0}
+        )
+        credit_wallet(
+            wallet,
+            amount,
+            f"Refund for order {archived.order_id}",
+            source="ORDER_CANCEL_REFUND"
+        )
+
+    refunded.append(razorpay_payment_id)
+    archived.save(update_fields=['data'])
+
+
+def receive_webhook(body, signature, event_id):
+    """
+    Verify and store a Razorpay webhook, then process it unless an
+    earlier delivery of the same event already was. Raises
+    SignatureVerificationError for bad signatures and ImproperlyConfigured
+    while no webhook secret is set; processing errors are
+    recorded on the event and re-raised so the gateway retries.
+    """
+    secret = getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', '')
+    if not secret:
+        # an empty key would make any HMAC "valid": refuse everything
+        raise ImproperlyConfigured("RAZORPAY_WEBHOOK_SECRET is not set")
+
+    get_razorpay_client().utility.verify_webhook_signature(
+        body.decode(), signature, secret
+    )
+
+    payload = json.loads(body)
+    # redeliveries carry the same id; fall back to the body's hash
+    event_id = event_id or hashlib.sha256(body).hexdigest()
+
+    event, _ = WebhookEvent.objects.get_or_create(
+        event_id=event_id,
+        defaults={
+            'event_type': payload.get('event', ''),
+            'payload': payload,
+        }
+    )
+
+    if event.processed_at:
+        return event
+
+    try:
+        process_webhook_event(event)
+    except Exception as exc:
+        WebhookEvent.objects.filter(pk=event.pk).update(error=repr(exc)[:2000])
+        raise
+
+    WebhookEvent.objects.filter(pk=event.pk).update(
+        processed_at=timezone.now(), error=''
+    )
+    return event
+
+
+def process_webhook_event(event):
+    if event.event_type not in PAYMENT_CAPTURED_EVENTS:
+        # failed attempts leave the order pending: the customer can
+        # retry, and the stock hold lapses if they never do
+        return
+
+    entity = event.payload['payload']['payment']['entity']
+    confirm_payment(entity['order_id'], entity['id'])
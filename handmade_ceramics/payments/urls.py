@@ -9,7 +9,10 @@ urlpatterns = [
     path("start/<str:order_id>/", views.start_payment, name="start"),
     path("verify/", views.verify_payment, name="verify"),  # optional now
     path("callback/", views.razorpay_callback, name="callback"),
+    path("webhook/", views.razorpay_webhook, name="webhook"),
     path("success/", views.payment_success, name="success"),
     path("failed/", views.payment_failed, name="failed"),
+    path("status/<str:order_id>/", views.payment_status, name="status"),
+    path("fake/pay/", views.fake_pay, name="fake_pay"),
 ]
 
@@ -1,15 +1,22 @@
 # payments/views.py
 
+import logging
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
+from django.views.decorators.http import require_POST
+from razorpay.errors import SignatureVerificationError
 
-from orders.models import Order, OrderItem
-from cart.models import CartItem
+from orders.models import Order, OUT_OF_STOCK_REASON
 from .models import Payment
-from .services import get_razorpay_client
+from .fake_gateway import FakeRazorpayClient
+from .services import get_razorpay_client, receive_webhook
+
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -33,7 +40,8 @@ def start_payment(request, order_id):
             "payment_capture": 1,
         })
     except Exception:
-        return redirect('some_order_detail_or_cart_page', order_id=order.order_id)
+        # gateway down or timed out; the stock hold lapses on its own
+        return redirect("payments:failed")
 
     payment = Payment.objects.create(
         order=order,
@@ -51,76 +59,123 @@ def start_payment(request, order_id):
         "razorpay_order_id": razorpay_order["id"],
         "amount": amount_in_paise,
         "currency": "INR",
+        "fake_gateway": isinstance(razorpay_client, FakeRazorpayClient),
     }
 
     return render(request, "payments/razorpay_checkout.html", context)
 
 
-@csrf_exempt
-def verify_payment(request):
-
-    if request.method != "POST":
-        return render(request, "payments/payment_failed.html")
-
+@login_required
+@require_POST
+def fake_pay(request):
+    """
+    The fake gateway's hosted checkout: pays the order on the in-process
+    gateway and returns the signed fields Razorpay's checkout.js would
+    hand to the page. 404 unless the fake gateway is configured.
+    """
+    client = get_razorpay_client()
+    if not isinstance(client, FakeRazorpayClient):
+        raise Http404
+
+    payment = Payment.objects.filter(
+        razorpay_order_id=request.POST.get("razorpay_order_id"),
+        order__user=request.user,
+    ).first()
+    if payment is None:
+        raise Http404
+
+    response = client.pay(payment.razorpay_order_id)
+    if response is None:
+        return JsonResponse({"error": "Payment declined"}, status=402)
+
+    return JsonResponse(response)
+
+
+def _payment_from_redirect(request):
+    """
+    The Payment named by the checkout's signed POST, or None for
+    incomplete or badly signed posts. Read-only: the webhook (or the
+    reconciler, if it never arrives) confirms the payment, so a forged
+    or replayed redirect cannot settle anything.
+    """
     razorpay_payment_id = request.POST.get("razorpay_payment_id")
     razorpay_order_id = request.POST.get("razorpay_order_id")
     razorpay_signature = request.POST.get("razorpay_signature")
 
     if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature]):
-        return render(request, "payments/payment_failed.html")
-
-    client = get_razorpay_client()
+        return None
 
     try:
-        client.utility.verify_payment_signature({
+        get_razorpay_client().utility.verify_payment_signature({
             "razorpay_payment_id": razorpay_payment_id,
             "razorpay_order_id": razorpay_order_id,
             "razorpay_signature": razorpay_signature,
         })
+    except SignatureVerificationError:
+        return None
+
+    return (
+        Payment.objects
+        .select_related('order')
+        .filter(razorpay_order_id=razorpay_order_id)
+        .first()
+    )
 
-        with transaction.atomic():
-            payment = Payment.objects.select_for_update().get(
-                razorpay_order_id=razorpay_order_id
-            )
 
-            payment.razorpay_payment_id = razorpay_payment_id
-            payment.razorpay_signature = razorpay_signature
-            payment.status = "SUCCESS"
-            payment.save()
+def _payment_outcome(payment):
+    """
+    'success', 'processing' (captured at the gateway but not confirmed
+    here yet), 'out_of_stock' (paid, but the order was cancelled and
+    refunded to the wallet) or 'failed'.
+    """
+    if payment is None or payment.status == "FAILED":
+        return "failed"
 
-            order = payment.order
-            order.is_paid = True
-            order.status = "CONFIRMED"
-            order.payment_method = "RAZORPAY"
-            order.save()
+    if payment.status == "PENDING":
+        return "processing"
 
-            if order.coupon:
-                from coupons.models import CouponUsage
-                CouponUsage.objects.get_or_create(user=order.user, coupon=order.coupon, order=order)
+    if payment.order.cancellation_reason == OUT_OF_STOCK_REASON:
+        return "out_of_stock"
 
-            order_items = OrderItem.objects.select_related("variant").filter(order=order)
-            for item in order_items:
-                item.variant.stock -= item.quantity
-                item.variant.save()
+    return "success" if payment.status == "SUCCESS" else "failed"
 
-            CartItem.objects.filter(cart__user=order.user).delete()
 
-        return render(request, "payments/payment_success.html", {"order": order})
+def _render_outcome(request, payment):
+    outcome = _payment_outcome(payment)
 
-    except Exception:
-        Payment.objects.filter(
-            razorpay_order_id=razorpay_order_id
-        ).update(status="FAILED")
+    if outcome in ("processing", "out_of_stock"):
+        return render(request, "payments/payment_processing.html", {
+            "order": payment.order,
+            "outcome": outcome,
+        })
 
-        payment = Payment.objects.filter(
-            razorpay_order_id=razorpay_order_id
-        ).first()
+    if outcome == "success":
+        return render(request, "payments/payment_success.html", {"order": payment.order})
 
-        if payment and payment.order and not payment.order.is_paid:
-            payment.order.delete()
+    return render(request, "payments/payment_failed.html")
 
+
+@csrf_exempt
+def verify_payment(request):
+
+    if request.method != "POST":
         return render(request, "payments/payment_failed.html")
 
+    return _render_outcome(request, _payment_from_redirect(request))
+
+
+@login_required
+def payment_status(request, order_id):
+    """Where the processing page refreshes to until the webhook lands."""
+    payment = (
+        Payment.objects
+        .select_related('order')
+        .filter(order__order_id=order_id, order__user=request.user)
+        .order_by('-pk')
+        .first()
+    )
+    return _render_outcome(request, payment)
+
 
 def payment_success(request):
     return render(request, "payments/payment_success.html")
@@ -136,50 +191,34 @@ def razorpay_callback(request):
     if request.method != "POST":
         return redirect("payments:failed")
 
-    razorpay_payment_id = request.POST.get("razorpay_payment_id")
-    razorpay_order_id = request.POST.get("razorpay_order_id")
-    razorpay_signature = request.POST.get("razorpay_signature")
-
-    if not all([razorpay_payment_id, razorpay_order_id, razorpay_signature]):
-        return redirect("payments:failed")
+    payment = _payment_from_redirect(request)
 
-    razorpay_client = get_razorpay_client()
+    if _payment_outcome(payment) in ("processing", "out_of_stock"):
+        return redirect("payments:status", order_id=payment.order.order_id)
 
-    try:
-        razorpay_client.utility.verify_payment_signature({
-            "razorpay_order_id": razorpay_order_id,
-            "razorpay_payment_id": razorpay_payment_id,
-            "razorpay_signature": razorpay_signature
-        })
-
-        with transaction.atomic():
-            payment = Payment.objects.select_for_update().get(
-                razorpay_order_id=razorpay_order_id
-            )
-
-            payment.razorpay_payment_id = razorpay_payment_id
-            payment.razorpay_signature = razorpay_signature
-            payment.status = "SUCCESS"
-            payment.save()
-
-            order = payment.order
-            order.is_paid = True
-            order.status = "CONFIRMED"
-            order.payment_method = "RAZORPAY"
-            order.save()
-
-            order_items = OrderItem.objects.select_related("variant").filter(order=order)
-            for item in order_items:
-                item.variant.stock -= item.quantity
-                item.variant.save()
+    if _payment_outcome(payment) != "success":
+        return redirect("payments:failed")
 
-            CartItem.objects.filter(cart__user=order.user).delete()
+    return redirect("payments:success")
 
-        return redirect("payments:success")
 
+@csrf_exempt
+@require_POST
+def razorpay_webhook(request):
+    try:
+        receive_webhook(
+            request.body,
+            request.headers.get("X-Razorpay-Signature", ""),
+            request.headers.get("X-Razorpay-Event-Id"),
+        )
+    except SignatureVerificationError:
+        return HttpResponseBadRequest("invalid signature")
+    except ImproperlyConfigured:
+        logger.error("Razorpay webhook rejected: RAZORPAY_WEBHOOK_SECRET is not set")
+        return HttpResponse("webhooks not configured", status=503)
     except Exception:
-        Payment.objects.filter(
-            razorpay_order_id=razorpay_order_id
-        ).update(status="FAILED")
+        logger.exception("Razorpay webhook failed")
+        # non-2xx makes the gateway deliver the event again later
+        return HttpResponse(status=500)
 
-        return redirect("payments:failed")
\ No newline at end of file
+    return HttpResponse(status=200)
@@ -0,0 +1,171 @@
+# product_management/management/commands/bench_stock_decrement.py
+
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from cart.models import Cart, CartItem
+from category_management.models import Category
+from checkout.views import _place_order
+from product_management.models import Product, Variant
+from product_management.services import (
+    decrement_stock,
+    enable_hot_mode,
+    disable_hot_mode,
+)
+from profiles.models import Address
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure single-variant checkout throughput for plain and sharded "
+        "stock at increasing worker counts. By default every iteration is "
+        "a real cash-on-delivery checkout through _place_order (cart "
+        "validation, order, items, stock); --through decrement times the "
+        "stock decrement alone. Creates a throwaway product and customers "
+        "and removes them afterwards. Run against PostgreSQL, not sqlite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8')
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument(
+            '--hold-ms',
+            type=float,
+            default=5.0,
+            help="Time each checkout transaction stays open after taking "
+                 "stock, standing in for the rest of place_order.",
+        )
+        parser.add_argument('--shards', type=int, default=8)
+        parser.add_argument(
+            '--through',
+            choices=('checkout', 'decrement'),
+            default='checkout',
+        )
+
+    def handle(self, *args, **options):
+        workers = [int(n) for n in options['workers'].split(',')]
+        self.seconds = options['seconds']
+        self.hold = options['hold_ms'] / 1000
+
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f"bench-{tag}")
+        product = Product.all_objects.create(
+            name=f"bench-{tag}", category=category, price=1
+        )
+        variant = Variant.objects.create(
+            product=product, color='bench', stock=10 ** 9
+        )
+        # saving the product unlisted it, as it had no variant yet
+        Product.all_objects.filter(pk=product.pk).update(is_listed=True)
+
+        self.customers = []
+        if options['through'] == 'checkout':
+            self.customers = [
+                self.make_customer(f"bench-{tag}-{slot}")
+                for slot in range(max(workers))
+            ]
+        run = self.run_checkout if self.customers else self.run
+
+        try:
+            self.stdout.write(f"{'workers':>8} {'plain/s':>10} {'sharded/s':>10}")
+
+            for n in workers:
+                plain = run(variant.pk, n)
+
+                enable_hot_mode(variant, options['shards'])
+                sharded = run(variant.pk, n)
+                disable_hot_mode(variant)
+
+                self.stdout.write(f"{n:>8} {plain:>10.0f} {sharded:>10.0f}")
+        finally:
+            for user, _, _ in self.customers:
+                user.delete()
+            product.delete()
+            category.delete()
+
+    def make_customer(self, username):
+        user = get_user_model().objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+            password=uuid.uuid4().hex,
+        )
+        address = Address.objects.create(
+            user=user, first_name='Bench', last_name='User',
+            country='India', street_address='1 Bench Road',
+            city='Kochi', state='Kerala', pin_code='682001',
+            phone='9876543210',
+        )
+        cart, _ = Cart.objects.get_or_create(user=user)
+        return user, address, cart
+
+    def run(self, variant_id, workers):
+        counts = [0] * workers
+        deadline = time.monotonic() + self.seconds
+
+        def work(slot):
+            try:
+                while time.monotonic() < deadline:
+                    with transaction.atomic():
+                        decrement_stock([(variant_id, 1)])
+                        time.sleep(self.hold)
+                    counts[slot] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, args=(slot,))
+            for slot in range(workers)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return sum(counts) / (time.monotonic() - started)
+
+    def run_checkout(self, variant_id, workers):
+        counts = [0] * workers
+        deadline = time.monotonic() + self.seconds
+        factory = RequestFactory()
+
+        def work(slot):
+            user, address, cart = self.customers[slot]
+            try:
+                while time.monotonic() < deadline:
+                    # a COD order empties the cart
+                    CartItem.objects.get_or_create(
+                        cart=cart, variant_id=variant_id,
+                        defaults={'quantity': 1}
+                    )
+                    request = factory.post(
+                        '/checkout/place-order/',
+                        {'address_id': address.pk, 'payment_method': 'COD'}
+                    )
+                    request.user = user
+                    request.session = {}
+                    request._messages = CookieStorage(request)
+
+                    if '/success/' in _place_order(request).url:
+                        counts[slot] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, args=(slot,))
+            for slot in range(workers)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return sum(counts) / (time.monotonic() - started)
@@ -0,0 +1,43 @@
+# product_management/management/commands/stock_shards.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product_management.models import Variant
+from product_management.services import (
+    enable_hot_mode,
+    disable_hot_mode,
+    reconcile_stock_shards,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage sharded stock for hot variants. `enable`/`disable` switch "
+        "a variant in or out of hot mode; `reconcile` copies shard totals "
+        "into Variant.stock and should run from cron every minute or so "
+        "while any variant is hot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['enable', 'disable', 'reconcile'])
+        parser.add_argument('variant_ids', nargs='*', type=int)
+        parser.add_argument('--shards', type=int, default=None)
+
+    def handle(self, *args, **options):
+        action = options['action']
+        variant_ids = options['variant_ids']
+
+        if action == 'reconcile':
+            count = reconcile_stock_shards(variant_ids or None)
+            self.stdout.write(f"Reconciled {count} hot variants.")
+            return
+
+        if not variant_ids:
+            raise CommandError(f"{action} needs at least one variant id.")
+
+        for variant in Variant.objects.filter(pk__in=variant_ids):
+            if action == 'enable':
+                enable_hot_mode(variant, options['shards'])
+            else:
+                disable_hot_mode(variant)
+            self.stdout.write(f"{action}d hot mode for {variant}.")
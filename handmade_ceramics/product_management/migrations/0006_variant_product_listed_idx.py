@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management', '0005_stockshard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='variant',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_listed', True)), fields=['product'], name='variant_product_listed_idx'),
+        ),
+    ]
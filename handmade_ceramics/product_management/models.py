@@ -2,11 +2,13 @@
 
 from django.db import models
 from django.utils import timezone
-from django.db.models import Avg, Count, Sum
+from django.db.models import Avg, Count, Sum, Max
 from decimal import Decimal
 from cloudinary.models import CloudinaryField
 from django.contrib.auth import get_user_model
 
+from .signals import variant_listed, variant_restocked
+
 User = get_user_model()
 
 
@@ -107,15 +109,7 @@ class Product(models.Model):
         )
 
     def get_discounted_price(self):
-        discount_percentage = self.get_best_discount_percentage()
-
-        if discount_percentage == 0:
-            return self.price
-
-        discount_amount = (Decimal(discount_percentage) / Decimal('100')) * self.price
-        final_price = self.price - discount_amount
-
-        return final_price.quantize(Decimal('0.01'))
+        return apply_discount(self.price, self.get_best_discount_percentage())
 
 
 class Variant(models.Model):
@@ -138,6 +132,13 @@ class Variant(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('product', 'color') 
+        indexes = [
+            models.Index(
+                fields=['product'],
+                name='variant_product_listed_idx',
+                condition=models.Q(is_deleted=False, is_listed=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.name} — {self.color}"
@@ -151,17 +152,45 @@ class Variant(models.Model):
     def gallery_images(self):
         return list(self.images.order_by('order')[1:])
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what we loaded so save() can spot a restock or relisting
+        instance._loaded_stock = instance.__dict__.get('stock')
+        instance._loaded_is_listed = instance.__dict__.get('is_listed')
+        return instance
+
     def save(self, *args, **kwargs):
         if self.stock == 0:
             self.is_listed = False
 
+        loaded_stock = getattr(self, '_loaded_stock', None)
+        restocked = loaded_stock == 0 and self.stock > 0
+        listed = (
+            getattr(self, '_loaded_is_listed', None) is False
+            and self.is_listed and self.stock > 0
+        )
+
         super().save(*args, **kwargs)
+        self._loaded_stock = self.stock
+        self._loaded_is_listed = self.is_listed
+
+        if loaded_stock is not None and self.stock != loaded_stock:
+            # hot variants sell from their shards; pass the edit on to them
+            from .services import adjust_shard_stock
+            adjust_shard_stock(self.pk, self.stock - loaded_stock)
 
         try:
             self.product.update_stock()
         except Exception:
             pass
 
+        if restocked:
+            variant_restocked.send(sender=Variant, variant=self)
+
+        if listed:
+            variant_listed.send(sender=Variant, variant=self)
+
 
 class VariantImage(models.Model):
     variant = models.ForeignKey(
@@ -177,6 +206,28 @@ class VariantImage(models.Model):
         ordering = ['order']
 
 
+class StockShard(models.Model):
+    """
+    Slice of a hot variant's sellable stock. While a variant has shards,
+    checkouts decrement a shard instead of the variant row, and
+    Variant.stock is refreshed from the shard total by reconciliation.
+    """
+    variant = models.ForeignKey(
+        Variant,
+        on_delete=models.CASCADE,
+        related_name='stock_shards'
+    )
+    shard = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['variant', 'shard']
+        unique_together = ('variant', 'shard')
+
+    def __str__(self):
+        return f"{self.variant_id}#{self.shard}: {self.stock}"
+
+
 def product_average_rating(product):
     agg = product.reviews.filter(
         is_approved=True
@@ -191,4 +242,52 @@ def get_related_products(product, limit=6):
     return Product.objects.filter(
         category=product.category,
         is_listed=True
-    ).exclude(pk=product.pk).order_by('-created_at')[:limit]
\ No newline at end of file
+    ).exclude(pk=product.pk).order_by('-created_at')[:limit]
+
+
+def apply_discount(price, discount_percentage):
+    if discount_percentage == 0:
+        return price
+
+    discount_amount = (Decimal(discount_percentage) / Decimal('100')) * price
+    final_price = price - discount_amount
+
+    return final_price.quantize(Decimal('0.01'))
+
+
+def get_best_discount_percentages(products):
+    """
+    Best active offer percentage for many products at once, keyed by
+    product id. Runs two grouped queries however many products are given.
+    """
+    from offers.models import ProductOffer, CategoryOffer
+
+    products = list(products)
+    if not products:
+        return {}
+
+    now = timezone.now()
+    active = dict(is_active=True, start_date__lte=now, end_date__gte=now)
+
+    product_best = dict(
+        ProductOffer.objects
+        .filter(product_id__in={p.pk for p in products}, **active)
+        .order_by()
+        .values('product_id')
+        .annotate(best=Max('discount_percentage'))
+        .values_list('product_id', 'best')
+    )
+
+    category_best = dict(
+        CategoryOffer.objects
+        .filter(category_id__in={p.category_id for p in products}, **active)
+        .order_by()
+        .values('category_id')
+        .annotate(best=Max('discount_percentage'))
+        .values_list('category_id', 'best')
+    )
+
+    return {
+        p.pk: max(product_best.get(p.pk, 0), category_best.get(p.category_id, 0))
+        for p in products
+    }
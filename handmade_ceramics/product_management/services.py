@@ -0,0 +1,347 @@
+# product_management/services.py
+
+from collections import Counter
+
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Case, When, Value, F, Sum, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, Variant, StockShard
+from .signals import variant_restocked
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a conditional stock decrement could not be applied.
+    `shortfalls` is a list of (variant_id, requested, available).
+    """
+
+    def __init__(self, shortfalls):
+        self.shortfalls = shortfalls
+        super().__init__(
+            "Insufficient stock for variant(s) "
+            + ", ".join(str(variant_id) for variant_id, _, _ in shortfalls)
+        )
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(pk=variant_id, then=Value(qty)) for variant_id, qty in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _merge(quantities):
+    merged = Counter()
+    for variant_id, qty in quantities:
+        if variant_id and qty:
+            merged[variant_id] += qty
+    return merged
+
+
+def decrement_stock(quantities):
+    """
+    Take stock for many variants with one conditional UPDATE:
+
+        UPDATE variant SET stock = stock - qty WHERE id IN (...) AND stock >= qty
+
+    `quantities` is an iterable of (variant_id, qty). Variants that hit
+    zero are unlisted, as Variant.save() would do. If any variant is
+    short, nothing is changed and InsufficientStock lists the shortfalls.
+    Product stock totals are rolled up afterwards in one statement.
+
+    Hot variants (those with stock shards) are taken from a shard instead
+    and left for reconcile_stock_shards() to roll up.
+    """
+    quantities = _merge(quantities)
+    if not quantities:
+        return
+
+    hot = _hot_variant_ids(quantities.keys())
+    cold = {k: v for k, v in quantities.items() if k not in hot}
+
+    cold_short = False
+    hot_shortfalls = []
+
+    with transaction.atomic():
+        if cold:
+            qty = _quantity_case(cold)
+
+            updated = Variant.objects.filter(
+                pk__in=cold.keys(),
+                stock__gte=qty,
+            ).update(
+                stock=F('stock') - qty,
+                is_listed=Case(
+                    When(stock=qty, then=Value(False)),
+                    default=F('is_listed'),
+                ),
+                updated_at=timezone.now(),
+            )
+            cold_short = updated != len(cold)
+
+        if not cold_short:
+            for variant_id in hot:
+                available = _take_from_shards(variant_id, quantities[variant_id])
+                if available is not None:
+                    hot_shortfalls.append(
+                        (variant_id, quantities[variant_id], available)
+                    )
+
+        if cold_short or hot_shortfalls:
+            # undo the rows that did match before reporting
+            transaction.set_rollback(True)
+
+    if cold_short:
+        raise InsufficientStock(_find_shortfalls(cold))
+    if hot_shortfalls:
+        raise InsufficientStock(hot_shortfalls)
+
+    if cold:
+        rollup_product_stock(variant_ids=cold.keys())
+
+
+def _find_shortfalls(quantities):
+    available = dict(
+        Variant.objects
+        .filter(pk__in=quantities.keys())
+        .values_list('pk', 'stock')
+    )
+    return [
+        (variant_id, qty, available.get(variant_id, 0))
+        for variant_id, qty in quantities.items()
+        if available.get(variant_id, 0) < qty
+    ]
+
+
+def restore_stock(quantities):
+    """
+    Put stock back for many variants (cancellations, returns) with one
+    grouped UPDATE, then roll up product totals. Variants coming back
+    from zero send variant_restocked.
+    """
+    quantities = _merge(quantities)
+    if not quantities:
+        return
+
+    hot = _hot_variant_ids(quantities.keys())
+    cold = {k: v for k, v in quantities.items() if k not in hot}
+
+    for variant_id in hot:
+        _add_to_shard(variant_id, quantities[variant_id])
+
+    if not cold:
+        return
+
+    # Variant.save() would announce these; keep wishlist alerts working
+    restocked = list(Variant.objects.filter(pk__in=cold.keys(), stock=0))
+
+    Variant.objects.filter(pk__in=cold.keys()).update(
+        stock=F('stock') + _quantity_case(cold),
+        updated_at=timezone.now(),
+    )
+
+    rollup_product_stock(variant_ids=cold.keys())
+
+    for variant in restocked:
+        variant_restocked.send(sender=Variant, variant=variant)
+
+
+def rollup_product_stock(product_ids=None, variant_ids=None):
+    """
+    Recompute Product.stock from its non-deleted variants for every
+    affected product in a single UPDATE.
+    """
+    products = Product.all_objects.all()
+
+    if variant_ids is not None:
+        products = products.filter(variants__pk__in=list(variant_ids)).distinct()
+    if product_ids is not None:
+        products = products.filter(pk__in=list(product_ids))
+
+    totals = (
+        Variant.objects
+        .filter(product=OuterRef('pk'), is_deleted=False)
+        .order_by()
+        .values('product')
+        .annotate(total=Sum('stock'))
+        .values('total')
+    )
+
+    Product.all_objects.filter(
+        pk__in=products.values('pk')
+    ).update(
+        stock=Coalesce(Subquery(totals), Value(0))
+    )
+
+
+# --- hot variants ----------------------------------------------------------
+#
+# A hot variant's sellable stock is split over StockShard rows so that
+# concurrent checkouts lock different rows instead of queueing on the one
+# Variant row. Variant.stock lags behind until reconcile_stock_shards() runs.
+
+
+def _hot_variant_ids(variant_ids):
+    # order_by() drops Meta.ordering, whose shard column would otherwise
+    # be selected too and defeat the distinct()
+    return set(
+        StockShard.objects
+        .filter(variant_id__in=list(variant_ids))
+        .order_by()
+        .values_list('variant_id', flat=True)
+        .distinct()
+    )
+
+
+def _take_from_shards(variant_id, qty):
+    """
+    Decrement one shard that can cover `qty`, skipping shards other
+    checkouts hold. Falls back to locking every shard and spreading the
+    take when no single free shard is big enough. Returns None on
+    success, or the available total when the variant is short.
+    """
+    shard = (
+        StockShard.objects
+        .select_for_update(skip_locked=True)
+        .filter(variant_id=variant_id, stock__gte=qty)
+        .order_by('?')
+        .first()
+    )
+
+    if shard:
+        StockShard.objects.filter(pk=shard.pk).update(stock=F('stock') - qty)
+        return None
+
+    shards = list(
+        StockShard.objects
+        .select_for_update()
+        .filter(variant_id=variant_id, stock__gt=0)
+        .order_by('shard')
+    )
+
+    available = sum(s.stock for s in shards)
+    if available < qty:
+        return available
+
+    for s in shards:
+        taken = min(s.stock, qty)
+        s.stock -= taken
+        qty -= taken
+
+    StockShard.objects.bulk_update(shards, ['stock'])
+    return None
+
+
+def _add_to_shard(variant_id, qty):
+    shard = (
+        StockShard.objects
+        .filter(variant_id=variant_id)
+        .order_by('?')
+        .values('pk')[:1]
+    )
+    StockShard.objects.filter(pk__in=Subquery(shard)).update(
+        stock=F('stock') + qty
+    )
+
+
+def adjust_shard_stock(variant_id, delta):
+    """
+    Apply a direct edit of a hot variant's stock (admin restock,
+    item cancellation via Variant.save) to its shards. No-op for
+    variants without shards.
+    """
+    if not StockShard.objects.filter(variant_id=variant_id).exists():
+        return
+
+    with transaction.atomic():
+        if delta > 0:
+            _add_to_shard(variant_id, delta)
+        else:
+            shards = list(
+                StockShard.objects
+                .select_for_update()
+                .filter(variant_id=variant_id, stock__gt=0)
+                .order_by('shard')
+            )
+            remaining = -delta
+            for s in shards:
+                taken = min(s.stock, remaining)
+                s.stock -= taken
+                remaining -= taken
+            StockShard.objects.bulk_update(shards, ['stock'])
+
+        reconcile_stock_shards([variant_id])
+
+
+def enable_hot_mode(variant, shards=None):
+    """Split a variant's current stock across `shards` shard rows."""
+    shards = shards or getattr(settings, 'STOCK_SHARDS_PER_VARIANT', 8)
+
+    with transaction.atomic():
+        variant = Variant.objects.select_for_update().get(pk=variant.pk)
+
+        if variant.stock_shards.exists():
+            return variant
+
+        base, extra = divmod(variant.stock, shards)
+
+        StockShard.objects.bulk_create([
+            StockShard(
+                variant=variant,
+                shard=n,
+                stock=base + (1 if n < extra else 0),
+            )
+            for n in range(shards)
+        ])
+
+    return variant
+
+
+def disable_hot_mode(variant):
+    """Fold a variant's shards back into Variant.stock."""
+    with transaction.atomic():
+        list(variant.stock_shards.select_for_update())
+        reconcile_stock_shards([variant.pk])
+        variant.stock_shards.all().delete()
+
+
+def reconcile_stock_shards(variant_ids=None):
+    """
+    Copy shard totals into Variant.stock (unlisting sold-out variants)
+    and roll up product stock. Returns the number of variants updated.
+    """
+    hot = StockShard.objects.all()
+    if variant_ids is not None:
+        hot = hot.filter(variant_id__in=list(variant_ids))
+
+    # without order_by() the default ordering makes this one id per shard
+    hot_ids = list(
+        hot.order_by().values_list('variant_id', flat=True).distinct()
+    )
+    if not hot_ids:
+        return 0
+
+    totals = (
+        StockShard.objects
+        .filter(variant=OuterRef('pk'))
+        .order_by()
+        .values('variant')
+        .annotate(total=Sum('stock'))
+        .values('total')
+    )
+    updated = Variant.objects.filter(pk__in=hot_ids).update(
+        stock=Coalesce(Subquery(totals), Value(0)),
+        updated_at=timezone.now(),
+    )
+    Variant.objects.filter(
+        pk__in=hot_ids,
+        stock=0,
+        is_listed=True
+    ).update(is_listed=False)
+
+    rollup_product_stock(variant_ids=hot_ids)
+    return updated
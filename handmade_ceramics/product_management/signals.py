@@ -0,0 +1,11 @@
+# product_management/signals.py
+
+from django.dispatch import Signal
+
+# Sent after a Variant is saved with stock going from 0 to above 0.
+# Receivers get `variant`.
+variant_restocked = Signal()
+
+# Sent after a Variant with stock is saved going from unlisted to listed.
+# Receivers get `variant`.
+variant_listed = Signal()
@@ -37,7 +37,7 @@ def process_cropped_image(request):
 
 @login_required
 def profile_view(request):
-    profile, _ = Profile.objects.get_or_create(user=request.user)
+    profile = request.shopper.profile
     return render(request, 'profiles/profile/profile_view.html', {'profile': profile})
 
 @login_required
@@ -81,7 +81,7 @@ def change_password(request):
 
 @login_required
 def address_list(request):
-    profile = Profile.objects.get(user=request.user)
+    profile = request.shopper.profile
     addresses = Address.objects.filter(user=request.user, is_deleted=False)
     return render(request, 'profiles/address/address_list.html', {
         'addresses': addresses,
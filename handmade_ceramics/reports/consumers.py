@@ -0,0 +1,65 @@
+# reports/consumers.py
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection
+
+from orders.events import order_event_consumer
+from .models import OrderStatusRollup
+
+
+def event_deltas(events):
+    """
+    (day, status) -> [order count delta, amount delta] for a batch. Every
+    event only adds or subtracts, so batches can be applied in any order.
+    """
+    deltas = defaultdict(lambda: [0, Decimal("0.00")])
+
+    for event in events:
+        day = event.data['created_on']
+        total = Decimal(event.data['total_amount'])
+
+        if event.event_type == 'CREATED':
+            deltas[day, event.to_status][0] += 1
+            deltas[day, event.to_status][1] += total
+
+        elif event.event_type == 'TOTALS_CHANGED':
+            previous = Decimal(event.data['previous_total'])
+            deltas[day, event.to_status][1] += total - previous
+
+        elif event.event_type == 'STATUS_CHANGED':
+            deltas[day, event.from_status][0] -= 1
+            deltas[day, event.from_status][1] -= total
+            deltas[day, event.to_status][0] += 1
+            deltas[day, event.to_status][1] += total
+
+    return {
+        key: delta for key, delta in deltas.items()
+        if delta[0] or delta[1]
+    }
+
+
+@order_event_consumer('report_rollups')
+def update_status_rollups(events):
+    deltas = event_deltas(events)
+    if not deltas:
+        return
+
+    table = OrderStatusRollup._meta.db_table
+
+    # add to the existing row, or create it, in one statement per bucket
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"""
+            INSERT INTO {table} (day, status, order_count, total_amount)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (day, status) DO UPDATE SET
+                order_count = {table}.order_count + EXCLUDED.order_count,
+                total_amount = {table}.total_amount + EXCLUDED.total_amount
+            """,
+            [
+                (day, status, count, amount)
+                for (day, status), (count, amount) in sorted(deltas.items())
+            ],
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.11 on 2026-10-19 10:14
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    # later changes arrive as order events; start from the orders as they are
+    Order = apps.get_model('orders', 'Order')
+    OrderStatusRollup = apps.get_model('reports', 'OrderStatusRollup')
+
+    rows = (
+        Order.objects
+        .values('created_at__date', 'status')
+        .annotate(order_count=Count('pk'), total_amount=Sum('total_amount'))
+        .order_by()
+    )
+
+    OrderStatusRollup.objects.bulk_create([
+        OrderStatusRollup(
+            day=row['created_at__date'],
+            status=row['status'],
+            order_count=row['order_count'],
+            total_amount=row['total_amount'] or 0,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0015_orderevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=30)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['day', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='reports_rollup_day_status_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,24 @@
 from django.db import models
 
-# Create your models here.
+
+class OrderStatusRollup(models.Model):
+    """
+    Number and value of orders per creation day and current status,
+    kept up to date from order events by reports.consumers.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=30)
+    order_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['day', 'status']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status'],
+                name='reports_rollup_day_status_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} | {self.status} | {self.order_count}"
@@ -3,7 +3,8 @@
 from datetime import date, timedelta, datetime
 from django.db.models import Sum, Count
 from django.db.models.functions import TruncDay, TruncMonth, TruncYear
-from orders.models import Order
+from orders.models import Order, ORDER_STATUS_CHOICES
+from .models import OrderStatusRollup
 
 
 class SalesReportService:
@@ -114,3 +115,38 @@ class SalesReportService:
             .annotate(total=Sum("total_amount"))
             .order_by("period")
         )
+
+    # -----------------------------
+    # STATUS BREAKDOWN
+    # -----------------------------
+    def get_status_breakdown(self):
+        """
+        Orders and their value per current status, read from the rollup
+        table instead of scanning orders.
+        """
+        queryset = OrderStatusRollup.objects.all()
+        if self.start_date and self.end_date:
+            queryset = queryset.filter(
+                day__range=[self.start_date, self.end_date]
+            )
+
+        labels = dict(ORDER_STATUS_CHOICES)
+
+        return [
+            {
+                "status": labels.get(
+                    row["status"], row["status"].replace("_", " ").title()
+                ),
+                "order_count": row["order_count"],
+                "total_amount": row["total_amount"],
+            }
+            for row in (
+                queryset.values("status")
+                .annotate(
+                    order_count=Sum("order_count"),
+                    total_amount=Sum("total_amount"),
+                )
+                .filter(order_count__gt=0)
+                .order_by("-order_count")
+            )
+        ]
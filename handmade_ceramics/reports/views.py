@@ -28,6 +28,7 @@ def sales_report_view(request):
 
     summary = service.get_summary()
     chart_data = service.get_chart_data()
+    status_breakdown = service.get_status_breakdown()
     orders_queryset = service.get_queryset()
 
     # EXPORT
@@ -46,6 +47,7 @@ def sales_report_view(request):
         "summary": summary,
         "orders": orders,
         "chart_data": chart_data,
+        "status_breakdown": status_breakdown,
         "report_type": report_type,
         "start_date": start_date,
         "end_date": end_date,
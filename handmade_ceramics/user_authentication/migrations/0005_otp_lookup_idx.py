@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_authentication', '0004_alter_otp_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['email', 'purpose', 'is_used', 'created_at'], name='otp_lookup_idx'),
+        ),
+    ]
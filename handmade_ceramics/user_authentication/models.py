@@ -25,6 +25,14 @@ class OTP(models.Model):
     attempts = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['email', 'purpose', 'is_used', 'created_at'],
+                name='otp_lookup_idx',
+            ),
+        ]
+
     @staticmethod
     def generate_otp():
         return str(random.randint(100000, 999999))
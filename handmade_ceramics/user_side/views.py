@@ -10,7 +10,6 @@ from user_side.forms import ShopFilterForm
 
 from product_management.models import Product, Variant
 from category_management.models import Category
-from wishlist.models import Wishlist 
 
 
 @never_cache
@@ -51,12 +50,7 @@ def home(request):
         is_listed=True
     ).order_by('-created_at')[:12]
 
-    wishlist_variant_ids = []
-    if request.user.is_authenticated:
-        wishlist_variant_ids = list(
-            Wishlist.objects.filter(user=request.user)
-            .values_list('variant_id', flat=True)
-        )
+    wishlist_variant_ids = request.shopper.wishlist_variant_ids
 
     return render(request, 'user_side/home.html', {
         'products_page': products_page,
@@ -135,12 +129,7 @@ def shop(request):
     query_params = request.GET.copy()
     query_params.pop('page', None)
 
-    wishlist_variant_ids = []
-    if request.user.is_authenticated:
-        wishlist_variant_ids = list(
-            Wishlist.objects.filter(user=request.user)
-            .values_list('variant_id', flat=True)
-        )
+    wishlist_variant_ids = request.shopper.wishlist_variant_ids
 
     return render(request, 'user_side/shop.html', {
         'form': form,
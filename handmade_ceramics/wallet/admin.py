@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import WalletCheckpoint, WalletDrift
+
+
+@admin.register(WalletDrift)
+class WalletDriftAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'stored_balance', 'ledger_balance', 'difference', 'detected_at', 'resolved_at')
+    list_filter = ('resolved_at',)
+    readonly_fields = ('wallet', 'stored_balance', 'ledger_balance', 'detected_at', 'resolved_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(WalletCheckpoint)
+class WalletCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'last_transaction_id', 'balance', 'transaction_count', 'created_at')
+    readonly_fields = ('wallet', 'last_transaction_id', 'balance', 'transaction_count', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
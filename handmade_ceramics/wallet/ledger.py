@@ -0,0 +1,205 @@
+# wallet/ledger.py
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DecimalField, F, Max, OuterRef, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Wallet, WalletCheckpoint, WalletDrift, WalletTransaction
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def signed_amount():
+    """A transaction's effect on its wallet: credits add, debits subtract."""
+    return Case(
+        When(transaction_type=WalletTransaction.DEBIT, then=-F('amount')),
+        default=F('amount'),
+        output_field=MONEY,
+    )
+
+
+def checkpoint_every():
+    return getattr(settings, 'WALLET_CHECKPOINT_EVERY', 100)
+
+
+def settle_before():
+    return timezone.now() - timedelta(
+        minutes=getattr(settings, 'WALLET_CHECKPOINT_SETTLE_MINUTES', 10)
+    )
+
+
+def _latest_checkpoint(field):
+    return Subquery(
+        WalletCheckpoint.objects
+        .filter(wallet=OuterRef('pk'))
+        .order_by('-last_transaction_id')
+        .values(field)[:1]
+    )
+
+
+def _entries_after(checkpoint_field, **filters):
+    # grouped by wallet, ready for a per-wallet aggregate
+    return (
+        WalletTransaction.objects
+        .filter(wallet=OuterRef('pk'), pk__gt=OuterRef(checkpoint_field), **filters)
+        .order_by()
+        .values('wallet')
+    )
+
+
+def annotate_ledger(wallets):
+    """
+    Annotate each wallet with its `ledger_balance`: the latest checkpoint
+    plus the transactions after it, computed for every wallet in one
+    query.
+    """
+    wallets = wallets.annotate(
+        checkpoint_txn=Coalesce(_latest_checkpoint('last_transaction_id'), Value(0)),
+        checkpoint_balance=Coalesce(
+            _latest_checkpoint('balance'), Value(Decimal('0.00')), output_field=MONEY
+        ),
+    )
+    since = _entries_after('checkpoint_txn').annotate(total=Sum(signed_amount())).values('total')
+
+    return wallets.annotate(
+        ledger_balance=F('checkpoint_balance') + Coalesce(
+            Subquery(since, output_field=MONEY), Value(Decimal('0.00')), output_field=MONEY
+        ),
+    )
+
+
+def ledger_balance(wallet):
+    """The wallet's balance according to its transactions."""
+    return annotate_ledger(
+        Wallet.objects.filter(pk=wallet.pk)
+    ).values_list('ledger_balance', flat=True).get()
+
+
+@transaction.atomic
+def rebuild_balance(wallet):
+    """
+    Set the stored balance to the ledger's. Locks the wallet so no debit
+    or credit lands between the sum and the write. Returns the balance.
+    """
+    Wallet.objects.select_for_update().filter(pk=wallet.pk).get()
+    wallet.balance = ledger_balance(wallet)
+    Wallet.objects.filter(pk=wallet.pk).update(
+        balance=wallet.balance, updated_at=timezone.now()
+    )
+    WalletDrift.objects.filter(
+        wallet_id=wallet.pk, resolved_at__isnull=True
+    ).update(resolved_at=timezone.now())
+    return wallet.balance
+
+
+def write_checkpoints(every=None, before=None):
+    """
+    Checkpoint every wallet with at least `every` transactions since its
+    last checkpoint, in one aggregate query and one insert. Only
+    transactions older than `before` count, so entries still inside an
+    open transaction are never skipped past. Returns the number written.
+    """
+    every = every or checkpoint_every()
+    before = before or settle_before()
+
+    wallets = Wallet.objects.annotate(
+        checkpoint_txn=Coalesce(_latest_checkpoint('last_transaction_id'), Value(0)),
+        checkpoint_balance=Coalesce(
+            _latest_checkpoint('balance'), Value(Decimal('0.00')), output_field=MONEY
+        ),
+    )
+    settled = _entries_after('checkpoint_txn', created_at__lte=before)
+    wallets = wallets.annotate(
+        settled_count=Coalesce(
+            Subquery(settled.annotate(n=Count('pk')).values('n')), Value(0)
+        ),
+        through_txn=Subquery(settled.annotate(last=Max('pk')).values('last')),
+    ).filter(settled_count__gte=every)
+
+    # sum by pk range rather than by age, so the checkpoint covers exactly
+    # the transactions up to through_txn
+    covered = (
+        WalletTransaction.objects
+        .filter(
+            wallet=OuterRef('pk'),
+            pk__gt=OuterRef('checkpoint_txn'),
+            pk__lte=OuterRef('through_txn'),
+        )
+        .order_by()
+        .values('wallet')
+    )
+    wallets = wallets.annotate(
+        covered_total=Subquery(
+            covered.annotate(total=Sum(signed_amount())).values('total'),
+            output_field=MONEY,
+        ),
+        covered_count=Subquery(covered.annotate(n=Count('pk')).values('n')),
+    )
+
+    checkpoints = [
+        WalletCheckpoint(
+            wallet_id=row['pk'],
+            last_transaction_id=row['through_txn'],
+            balance=row['checkpoint_balance'] + row['covered_total'],
+            transaction_count=row['covered_count'],
+        )
+        for row in wallets.values(
+            'pk', 'through_txn', 'checkpoint_balance', 'covered_total', 'covered_count'
+        )
+    ]
+    WalletCheckpoint.objects.bulk_create(checkpoints, ignore_conflicts=True)
+    return len(checkpoints)
+
+
+def find_drift():
+    """
+    (wallet_id, stored balance, ledger balance) for every wallet whose
+    stored balance differs from its ledger, from one query. The query
+    reads a single snapshot, and every debit or credit changes the
+    balance and the ledger in one transaction, so concurrent payments
+    never show up as drift.
+    """
+    return list(
+        annotate_ledger(Wallet.objects.all())
+        .exclude(balance=F('ledger_balance'))
+        .order_by('pk')
+        .values_list('pk', 'balance', 'ledger_balance')
+    )
+
+
+@transaction.atomic
+def flag_drift(drifts):
+    """
+    Record `drifts` from find_drift(): open a WalletDrift per newly
+    drifting wallet, refresh the figures on ones already open and resolve
+    the rest.
+    """
+    now = timezone.now()
+    by_wallet = {wallet_id: (stored, ledger) for wallet_id, stored, ledger in drifts}
+
+    open_drifts = WalletDrift.objects.select_for_update().filter(resolved_at__isnull=True)
+    open_drifts.exclude(wallet_id__in=by_wallet).update(resolved_at=now)
+
+    still_open = list(open_drifts.filter(wallet_id__in=by_wallet))
+    for drift in still_open:
+        drift.stored_balance, drift.ledger_balance = by_wallet[drift.wallet_id]
+    WalletDrift.objects.bulk_update(still_open, ['stored_balance', 'ledger_balance'])
+
+    known = {drift.wallet_id for drift in still_open}
+    WalletDrift.objects.bulk_create([
+        WalletDrift(
+            wallet_id=wallet_id,
+            stored_balance=stored,
+            ledger_balance=ledger,
+            detected_at=now,
+        )
+        for wallet_id, (stored, ledger) in by_wallet.items()
+        if wallet_id not in known
+    ])
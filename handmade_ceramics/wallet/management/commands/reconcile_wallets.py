@@ -0,0 +1,46 @@
+# wallet/management/commands/reconcile_wallets.py
+
+from django.core.management.base import BaseCommand
+
+from wallet.ledger import find_drift, flag_drift, rebuild_balance, write_checkpoints
+from wallet.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint wallets with WALLET_CHECKPOINT_EVERY new transactions, "
+        "then compare every stored balance with its ledger and record the "
+        "wallets that drifted. Run nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=None)
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help="Reset drifted balances to their ledger balance.",
+        )
+
+    def handle(self, *args, **options):
+        # check before checkpointing: a checkpoint is summed from the
+        # ledger, so drift is measured against the ledger either way
+        drifts = find_drift()
+        flag_drift(drifts)
+
+        for wallet_id, stored, ledger in drifts:
+            self.stderr.write(
+                f"Wallet {wallet_id}: stored {stored}, ledger {ledger} "
+                f"({stored - ledger:+})"
+            )
+
+        if options['rebuild']:
+            for wallet in Wallet.objects.filter(pk__in=[d[0] for d in drifts]):
+                rebuild_balance(wallet)
+
+        checkpoints = write_checkpoints(options['every'])
+
+        self.stdout.write(
+            f"{len(drifts)} wallets drifted"
+            f"{' and were rebuilt' if options['rebuild'] and drifts else ''}; "
+            f"wrote {checkpoints} checkpoints."
+        )
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.11 on 2026-10-19 11:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def open_ledgers(apps, schema_editor):
+    # take today's balances as the opening checkpoint; the ledger is
+    # complete from here on
+    Wallet = apps.get_model('wallet', 'Wallet')
+    WalletCheckpoint = apps.get_model('wallet', 'WalletCheckpoint')
+    WalletTransaction = apps.get_model('wallet', 'WalletTransaction')
+
+    wallets = Wallet.objects.annotate(
+        last_transaction_id=Max('transactions__pk'),
+        transaction_count=Count('transactions'),
+    )
+
+    WalletCheckpoint.objects.bulk_create([
+        WalletCheckpoint(
+            wallet_id=wallet.pk,
+            last_transaction_id=wallet.last_transaction_id or 0,
+            balance=wallet.balance,
+            transaction_count=wallet.transaction_count,
+        )
+        for wallet in wallets.iterator()
+    ], batch_size=1000)
+
+    # order payments used to be written without a source
+    WalletTransaction.objects.filter(
+        Q(order__isnull=False) | Q(description__startswith='Payment for order'),
+        transaction_type='DEBIT',
+        source='MANUAL',
+    ).update(source='ORDER_PAYMENT')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet', '0002_wallettransaction_wallet_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletDrift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stored_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('ledger_balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drifts', to='wallet.wallet')),
+            ],
+            options={
+                'ordering': ['-detected_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='wallet.wallet')),
+            ],
+            options={
+                'ordering': ['-last_transaction_id'],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'last_transaction_id'), name='wallet_checkpoint_wallet_txn_uniq')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
@@ -60,6 +60,70 @@ class WalletTransaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['wallet', '-created_at'], name='wallet_txn_wallet_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.transaction_id} - {self.transaction_type} - {self.amount}"
\ No newline at end of file
+        return f"{self.transaction_id} - {self.transaction_type} - {self.amount}"
+
+class WalletCheckpoint(models.Model):
+    """
+    A wallet's ledger balance up to and including transaction
+    `last_transaction_id`. The balance at any point is the latest
+    checkpoint plus the signed transactions after it, so verifying or
+    rebuilding a wallet never sums its whole history.
+    """
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='checkpoints'
+    )
+
+    # pk of the last WalletTransaction covered (0: none)
+    last_transaction_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    # transactions covered since the previous checkpoint
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-last_transaction_id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'last_transaction_id'],
+                name='wallet_checkpoint_wallet_txn_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} @ {self.last_transaction_id} = {self.balance}"
+
+
+class WalletDrift(models.Model):
+    """
+    A wallet whose stored balance disagreed with its ledger at the last
+    reconciliation. Resolved once they agree again (or it is rebuilt).
+    """
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='drifts'
+    )
+
+    stored_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    ledger_balance = models.DecimalField(max_digits=12, decimal_places=2)
+
+    detected_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-detected_at']
+
+    @property
+    def difference(self):
+        return self.stored_balance - self.ledger_balance
+
+    def __str__(self):
+        return f"{self.wallet_id} | {self.stored_balance} vs {self.ledger_balance}"
@@ -1,32 +1,91 @@
-from django.db import transaction
-from .models import WalletTransaction
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Wallet, WalletTransaction
+
+
+class InsufficientBalance(ValueError):
+    """Raised when a conditional wallet debit could not be applied."""
+
+    def __init__(self, wallet_id, amount):
+        self.wallet_id = wallet_id
+        self.amount = amount
+        super().__init__("Insufficient wallet balance")
+
 
 @transaction.atomic
-def credit_wallet(wallet, amount, description, order=None):
-    wallet.balance += amount
-    wallet.save(update_fields=['balance'])
+def credit_wallet(wallet, amount, description, *, source, order=None):
+    """
+    Add `amount` to the wallet with an F() increment, so concurrent
+    credits never overwrite each other. `wallet.balance` is not updated
+    in memory; reload the wallet if the new balance is needed.
+    """
+    Wallet.objects.filter(pk=wallet.pk).update(
+        balance=F('balance') + amount,
+        updated_at=timezone.now(),
+    )
 
     WalletTransaction.objects.create(
         wallet=wallet,
         transaction_type=WalletTransaction.CREDIT,
+        source=source,
         amount=amount,
         description=description,
         order=order
     )
 
 
-@transaction.atomic
-def debit_wallet(wallet, amount, description, order=None):
-    if wallet.balance < amount:
-        raise ValueError("Insufficient wallet balance")
+def debit_wallet(wallet, amount, description, *, source, order=None):
+    """
+    Take `amount` from the wallet if it holds that much, without locking
+    it first: one statement subtracts the amount only where the balance
+    covers it and writes the ledger entry for the row it changed.
+    Sets and returns the new balance; raises InsufficientBalance (and
+    changes nothing) otherwise.
 
-    wallet.balance -= amount
-    wallet.save(update_fields=['balance'])
+    The debited row stays locked until the caller's transaction ends, so
+    debit as late in it as possible.
+    """
+    wallets = Wallet._meta.db_table
+    transactions = WalletTransaction._meta.db_table
 
-    WalletTransaction.objects.create(
-        wallet=wallet,
-        transaction_type=WalletTransaction.DEBIT,
-        amount=amount,
-        description=description,
-        order=order
-    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH debited AS (
+                UPDATE {wallets}
+                SET balance = balance - %(amount)s, updated_at = %(now)s
+                WHERE id = %(wallet)s AND balance >= %(amount)s
+                RETURNING id, balance
+            ), entry AS (
+                INSERT INTO {transactions} (
+                    transaction_id, wallet_id, transaction_type, source,
+                    amount, description, order_id, created_at
+                )
+                SELECT %(transaction_id)s, id, %(type)s, %(source)s,
+                       %(amount)s, %(description)s, %(order)s, %(now)s
+                FROM debited
+            )
+            SELECT balance FROM debited
+            """,
+            {
+                'wallet': wallet.pk,
+                'amount': amount,
+                'now': timezone.now(),
+                'transaction_id': uuid.uuid4(),
+                'type': WalletTransaction.DEBIT,
+                'source': source,
+                'description': description,
+                'order': order.pk if order is not None else None,
+            }
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        raise InsufficientBalance(wallet.pk, amount)
+
+    wallet.balance = row[0]
+    return wallet.balance
@@ -5,10 +5,12 @@ from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.contrib import messages
 
-from wallet.models import Wallet, WalletTransaction
+from wallet.services import InsufficientBalance, debit_wallet
 from orders.models import Order
+from orders.services.order_service import OrderService
+from orders.services.reservation_service import ReservationService
+from product_management.services import InsufficientStock
 from cart.models import CartItem
-from profiles.models import Profile
 
 
 @login_required
@@ -32,35 +34,30 @@ def wallet_payment(request, order_id):
         messages.error(request, "Invalid order amount.")
         return redirect(order.get_absolute_url())
 
-    wallet, _ = Wallet.objects.select_for_update().get_or_create(
-        user=request.user,
-        defaults={'balance': 0}
-    )
-
-    if wallet.balance < order.total_amount:
+    try:
+        with transaction.atomic():
+            debit_wallet(
+                request.shopper.wallet,
+                order.total_amount,
+                f"Payment for order {order.order_id}",
+                order=order,
+                source='ORDER_PAYMENT'
+            )
+
+            # converts any hold from checkout, retaking the stock of
+            # expired holds; a shortfall rolls the debit back with it
+            ReservationService.commit(order)
+    except InsufficientBalance:
         messages.error(request, "Insufficient wallet balance.")
         return redirect(order.get_absolute_url())
-
-    wallet.balance -= order.total_amount
-    wallet.save()
-
-    WalletTransaction.objects.create(
-        wallet=wallet,
-        transaction_type=WalletTransaction.DEBIT,
-        amount=order.total_amount,
-        description=f"Payment for order {order.order_id}"
-    )
-
-    for item in order.items.select_related('variant'):
-
-        if item.variant:
-            if item.variant.stock < item.quantity:
-                raise Exception(
-                    f"Insufficient stock for {item.product_name}"
-                )
-
-            item.variant.stock -= item.quantity
-            item.variant.save()
+    except InsufficientStock:
+        OrderService.cancel_unfulfillable(order)
+        messages.error(
+            request,
+            "Some items in this order sold out before payment, so it was "
+            "cancelled. Your wallet was not charged."
+        )
+        return redirect(order.get_absolute_url())
 
     order.is_paid = True
     order.payment_method = 'WALLET'
@@ -77,18 +74,12 @@ def wallet_payment(request, order_id):
 @login_required
 def wallet_dashboard(request):
 
-    wallet, _ = Wallet.objects.get_or_create(
-        user=request.user,
-        defaults={'balance': 0}
-    )
+    wallet = request.shopper.wallet
 
     transactions = wallet.transactions.order_by('-created_at')
 
-    try:
-        profile = Profile.objects.get(user=request.user)
-    except Profile.DoesNotExist:
-        profile = None
-        
+    profile = request.shopper.profile
+
     context = {
         'wallet': wallet,
         'transactions': transactions,
@@ -1,14 +1,17 @@
-from .models import Wishlist
+from .services import get_wishlist_variant_ids
 
 def wishlist_data(request):
+    shopper = getattr(request, 'shopper', None)
+    if shopper is not None:
+        return {
+            'wishlist_variant_ids': shopper.wishlist_variant_ids,
+            'wishlist_count': shopper.wishlist_count,
+        }
+
     if request.user.is_authenticated:
-        variant_ids = (
-            Wishlist.objects
-            .filter(user=request.user)
-            .values_list('variant_id', flat=True)
-        )
+        variant_ids = get_wishlist_variant_ids(request.user)
         return {
-            'wishlist_variant_ids': set(variant_ids),
+            'wishlist_variant_ids': variant_ids,
             'wishlist_count': len(variant_ids),
         }
 
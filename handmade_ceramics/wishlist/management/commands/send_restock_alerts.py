@@ -0,0 +1,17 @@
+# wishlist/management/commands/send_restock_alerts.py
+
+from django.core.management.base import BaseCommand
+
+from wishlist.notifications import send_pending_restock_alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Send pending back-in-stock emails. Run from cron when "
+        "RESTOCK_ALERTS_ASYNC is off, or to pick up alerts for variants "
+        "that were relisted after being restocked."
+    )
+
+    def handle(self, *args, **options):
+        sent = send_pending_restock_alerts()
+        self.stdout.write(f"Sent {sent} restock emails.")
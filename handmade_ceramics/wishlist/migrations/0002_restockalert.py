@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-18 23:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_management', '0004_alter_variant_unique_together_and_more'),
+        ('wishlist', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('notified_count', models.PositiveIntegerField(default=0)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='restock_alerts', to='product_management.variant')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['created_at'], name='wishlist_restock_pending_idx')],
+            },
+        ),
+    ]
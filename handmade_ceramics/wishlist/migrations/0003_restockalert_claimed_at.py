@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wishlist', '0002_restockalert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restockalert',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -22,3 +22,29 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"{self.user} ❤️ {self.variant}"
+
+
+class RestockAlert(models.Model):
+    """
+    One pending "back in stock" fan-out for a variant. Created when the
+    variant's stock goes from 0 to above 0 and claimed by the sender job;
+    a claim older than RESTOCK_ALERT_CLAIM_SECONDS counts as abandoned.
+    """
+    variant = models.ForeignKey(Variant, on_delete=models.CASCADE, related_name='restock_alerts')
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    notified_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                name='wishlist_restock_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Restock alert for {self.variant}"
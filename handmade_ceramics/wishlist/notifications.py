@@ -0,0 +1,173 @@
+# wishlist/notifications.py
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Wishlist, RestockAlert
+
+logger = logging.getLogger(__name__)
+
+def _batch_size():
+    return getattr(settings, 'RESTOCK_EMAIL_BATCH_SIZE', 100)
+
+
+def _batch_pause():
+    return getattr(settings, 'RESTOCK_EMAIL_BATCH_PAUSE', 1.0)
+
+
+def _claim_expiry():
+    return timezone.now() - timedelta(
+        seconds=getattr(settings, 'RESTOCK_ALERT_CLAIM_SECONDS', 900)
+    )
+
+
+def queue_restock_alert(variant):
+    """
+    Record a pending alert and, once the surrounding transaction commits,
+    start sending it in a background thread. The caller (usually an admin
+    request) only pays for one INSERT.
+    """
+    RestockAlert.objects.create(variant=variant)
+    wake_restock_sender()
+
+
+def wake_restock_sender():
+    """
+    Start the background sender once the surrounding transaction commits,
+    e.g. when a restocked variant is finally listed.
+    """
+    if getattr(settings, 'RESTOCK_ALERTS_ASYNC', True):
+        transaction.on_commit(_start_sender_thread)
+
+
+def _start_sender_thread():
+    threading.Thread(target=_send_in_thread, daemon=True).start()
+
+
+def _send_in_thread():
+    try:
+        send_pending_restock_alerts()
+    finally:
+        close_old_connections()
+
+
+def send_pending_restock_alerts():
+    """
+    Send every pending alert whose variant is purchasable again.
+    Returns the number of emails sent.
+
+    Each alert is claimed with one UPDATE, sent outside any transaction
+    and then marked processed, so no row lock or transaction stays open
+    over the SMTP round trips. An alert whose emails fail is released for
+    the next run; one whose sender died is picked up again once its claim
+    expires. A failure partway through resends to the earlier batches.
+    """
+    sent = 0
+
+    pending = (
+        RestockAlert.objects
+        .filter(
+            processed_at__isnull=True,
+            variant__is_deleted=False,
+            variant__is_listed=True,
+            variant__stock__gt=0,
+        )
+        .values_list('pk', flat=True)
+    )
+
+    for alert_id in list(pending):
+        # claim the alert so concurrent senders never double-send
+        claimed = RestockAlert.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=_claim_expiry()),
+            pk=alert_id,
+            processed_at__isnull=True,
+        ).update(claimed_at=timezone.now())
+
+        if not claimed:
+            continue
+
+        alert = RestockAlert.objects.select_related('variant__product').get(pk=alert_id)
+
+        try:
+            count = send_restock_alert(alert)
+        except Exception:
+            logger.exception("Restock alert %s failed, leaving it pending", alert_id)
+            RestockAlert.objects.filter(pk=alert_id).update(claimed_at=None)
+            continue
+
+        RestockAlert.objects.filter(pk=alert_id).update(
+            processed_at=timezone.now(),
+            notified_count=count,
+        )
+        sent += count
+
+    return sent
+
+
+def send_restock_alert(alert):
+    """
+    Email everyone wishlisting the alert's variant. Subscribers are
+    streamed with iterator() and each batch is sent over one SMTP
+    connection, pausing between batches to stay under provider limits.
+    """
+    variant = alert.variant
+    product = variant.product
+
+    subject = f"Back in stock: {product.name} ({variant.color})"
+    url = "https://{domain}{path}?variant={variant_id}".format(
+        domain=Site.objects.get_current().domain,
+        path=reverse('custom_admin:product_management:product_detail', args=[product.pk]),
+        variant_id=variant.pk,
+    )
+    body = (
+        f"Good news! {product.name} in {variant.color} from your wishlist "
+        f"is back in stock.\n\n{url}\n"
+    )
+
+    batch_size = _batch_size()
+
+    emails = (
+        Wishlist.objects
+        .filter(variant=variant, user__is_active=True)
+        .exclude(user__email='')
+        .values_list('user__email', flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+
+    sent = 0
+    batch = []
+
+    for email in emails:
+        batch.append(email)
+
+        if len(batch) >= batch_size:
+            sent += _send_batch(subject, body, batch)
+            batch = []
+            time.sleep(_batch_pause())
+
+    if batch:
+        sent += _send_batch(subject, body, batch)
+
+    return sent
+
+
+def _send_batch(subject, body, recipients):
+    messages = [
+        EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email])
+        for email in recipients
+    ]
+
+    # errors must reach send_pending_restock_alerts, which keeps the
+    # alert pending
+    with get_connection(fail_silently=False) as connection:
+        return connection.send_messages(messages) or 0
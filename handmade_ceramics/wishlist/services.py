@@ -0,0 +1,99 @@
+# wishlist/services.py
+
+from django.db.models import Prefetch
+
+from product_management.models import (
+    VariantImage,
+    apply_discount,
+    get_best_discount_percentages,
+)
+from .models import Wishlist
+
+
+IN_STOCK = 'IN_STOCK'
+OUT_OF_STOCK = 'OUT_OF_STOCK'
+UNAVAILABLE = 'UNAVAILABLE'
+
+
+def get_wishlist_variant_ids(user):
+    """
+    Set of variant ids the user has wishlisted. Pages get these through
+    request.shopper, which loads them with the rest of the shopper's
+    header data; this is for requests without it.
+    """
+    return set(
+        Wishlist.objects
+        .filter(user=user)
+        .values_list('variant_id', flat=True)
+    )
+
+
+def add_variant(user, variant):
+    _, created = Wishlist.objects.get_or_create(user=user, variant=variant)
+    return created, get_wishlist_variant_ids(user)
+
+
+def remove_variants(user, variant_ids):
+    variant_ids = list(variant_ids)
+    deleted, _ = Wishlist.objects.filter(
+        user=user,
+        variant_id__in=variant_ids
+    ).delete()
+    return deleted, get_wishlist_variant_ids(user)
+
+
+def stock_status(variant):
+    product = variant.product
+
+    if (variant.is_deleted or product.is_deleted or
+            not product.is_listed):
+        return UNAVAILABLE
+
+    if variant.stock <= 0:
+        return OUT_OF_STOCK
+
+    if not variant.is_listed:
+        return UNAVAILABLE
+
+    return IN_STOCK
+
+
+def load_wishlist(user):
+    """
+    Wishlist rows with price, primary image and stock state attached.
+
+    Uses a fixed number of queries: the rows with their variant/product,
+    one prefetch for images and two grouped offer lookups.
+    """
+    items = list(
+        Wishlist.objects
+        .filter(user=user)
+        .select_related('variant__product')
+        .prefetch_related(
+            Prefetch(
+                'variant__images',
+                queryset=VariantImage.objects.order_by('order'),
+                to_attr='ordered_images'
+            )
+        )
+    )
+
+    products = {item.variant.product_id: item.variant.product for item in items}
+    discounts = get_best_discount_percentages(products.values())
+
+    for item in items:
+        variant = item.variant
+        product = variant.product
+
+        item.discount_percentage = discounts.get(product.pk, 0)
+        item.unit_price = apply_discount(product.price, item.discount_percentage)
+        item.stock_status = stock_status(variant)
+
+        if variant.ordered_images:
+            item.image_url = variant.ordered_images[0].image.url
+        elif product.main_image:
+            item.image_url = product.main_image.url
+        else:
+            item.image_url = None
+
+    return items
@@ -0,0 +1,20 @@
+from django.dispatch import receiver
+
+from product_management.models import Variant
+from product_management.signals import variant_listed, variant_restocked
+from .models import RestockAlert
+from .notifications import queue_restock_alert, wake_restock_sender
+
+
+@receiver(variant_restocked, sender=Variant)
+def notify_wishlist_on_restock(sender, variant, **kwargs):
+    if variant.wishlisted_by.exists():
+        queue_restock_alert(variant)
+
+
+@receiver(variant_listed, sender=Variant)
+def send_alerts_on_listing(sender, variant, **kwargs):
+    # a restock by hand leaves the variant unlisted, so its alert only
+    # becomes sendable now
+    if RestockAlert.objects.filter(variant=variant, processed_at__isnull=True).exists():
+        wake_restock_sender()
@@ -1,38 +1,51 @@
 from django.shortcuts import redirect, get_object_or_404, render
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseBadRequest
+from django.http import HttpResponseBadRequest, JsonResponse
 from django.urls import reverse
+from django.db.models import Q
 
 from product_management.models import Variant
-from .models import Wishlist
-from profiles.models import Profile
+from .services import add_variant, remove_variants, load_wishlist
+
+
+def _is_ajax(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+def _bad_request(request, message):
+    if _is_ajax(request):
+        return JsonResponse({'error': message}, status=400)
+    return HttpResponseBadRequest(message)
 
 
 @login_required
 def add_to_wishlist(request):
     if request.method != 'POST':
-        return HttpResponseBadRequest("Invalid request")
+        return _bad_request(request, "Invalid request")
 
     try:
         variant_id = int(request.POST.get('variant_id'))
     except (TypeError, ValueError):
-        return HttpResponseBadRequest("Invalid variant id")
+        return _bad_request(request, "Invalid variant id")
 
+    # out-of-stock variants are unlisted automatically; they can still be
+    # wishlisted so the user is emailed when they come back
     variant = get_object_or_404(
         Variant,
+        Q(is_listed=True) | Q(stock=0),
         pk=variant_id,
-        is_deleted=False,
-        is_listed=True
+        is_deleted=False
     )
 
-    # 🔒 Extra safety
-    if variant.stock <= 0:
-        return HttpResponseBadRequest("Variant out of stock")
+    created, variant_ids = add_variant(request.user, variant)
 
-    Wishlist.objects.get_or_create(
-        user=request.user,
-        variant=variant
-    )
+    if _is_ajax(request):
+        return JsonResponse({
+            'variant_id': variant.pk,
+            'in_wishlist': True,
+            'created': created,
+            'wishlist_count': len(variant_ids),
+        })
 
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
@@ -40,25 +53,23 @@ def add_to_wishlist(request):
 
 @login_required
 def remove_from_wishlist(request, variant_id):
-    Wishlist.objects.filter(
-        user=request.user,
-        variant_id=variant_id
-    ).delete()
+    deleted, variant_ids = remove_variants(request.user, [variant_id])
+
+    if _is_ajax(request):
+        return JsonResponse({
+            'variant_id': variant_id,
+            'in_wishlist': False,
+            'removed': bool(deleted),
+            'wishlist_count': len(variant_ids),
+        })
 
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
 @login_required
 def wishlist_page(request):
-    items = (
-        Wishlist.objects
-        .filter(user=request.user)
-        .select_related('variant__product')
-    )
-    try:
-        profile = Profile.objects.get(user=request.user)
-    except Profile.DoesNotExist:
-        profile = None
+    items = load_wishlist(request.user)
+    profile = request.shopper.profile
 
     return render(request, 'wishlist/wishlist_page.html', {
         'items': items,